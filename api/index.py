@@ -12,15 +12,31 @@ Endpoints:
   POST /api/admin/extend      — Admin extends a key
   POST /api/admin/delete      — Admin deletes a key
   POST /api/admin/deactivate  — Admin removes a machine from a key
+  GET  /api/admin/search      — Admin searches keys by key prefix, HWID, notes, machine name
+  POST /api/admin/reindex     — Admin rebuilds the search index
+  POST /api/admin/sweep-machines — Admin prunes machines inactive past the seat policy
+  GET  /api/admin/jobs        — Admin lists background jobs with progress
+  POST /api/admin/jobs        — Admin queues a background job
+  POST /api/admin/jobs/run    — Advance queued jobs for one bounded slice
+  POST /api/admin/jobs/cancel — Admin cancels a job
 """
 
 from flask import Flask, request, jsonify, make_response
 from upstash_redis import Redis
+from upstash_redis.client import Pipeline
+from upstash_redis.errors import UpstashError
+from requests import Session
 import os
+import copy
 import json
 import uuid
 import hashlib
+import re
+import math
+import threading
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
 from datetime import datetime
 
 app = Flask(__name__)
@@ -193,7 +209,7 @@ DASHBOARD_HTML = r'''<!DOCTYPE html>
     <div class="section">
         <h2>&#128203; All License Keys</h2>
         <div class="filters">
-            <input type="text" id="filter-search" placeholder="&#128269; Search key, notes..." oninput="filterKeys()">
+            <input type="text" id="filter-search" placeholder="&#128269; Search key, notes, machine, HWID..." oninput="filterKeys()">
             <select id="filter-status" onchange="filterKeys()">
                 <option value="">All Status</option>
                 <option value="active">Active</option>
@@ -245,21 +261,22 @@ DASHBOARD_HTML = r'''<!DOCTYPE html>
     </div>
 </div>
 <script>
-let API_BASE='';let adminPassword='';let allKeys=[];let currentActionKey='';
+let API_BASE='';let adminPassword='';let allKeys=[];let minRevision=0;let searchResults=[];let searchTimer=null;let currentActionKey='';
 function doLogin(){const pw=document.getElementById('login-password').value.trim();if(!pw)return;adminPassword=pw;apiGet('/api/admin/stats').then(r=>{if(r.success){document.getElementById('login-screen').style.display='none';document.getElementById('dashboard').style.display='block';localStorage.setItem('ig_admin_pw',pw);refreshAll()}else{showLoginError('Invalid password')}}).catch(()=>showLoginError('Connection error'))}
 function doLogout(){adminPassword='';localStorage.removeItem('ig_admin_pw');document.getElementById('dashboard').style.display='none';document.getElementById('login-screen').style.display='flex';document.getElementById('login-password').value=''}
 function showLoginError(msg){const el=document.getElementById('login-error');el.textContent=msg;el.style.display='block';setTimeout(()=>el.style.display='none',3000)}
 window.addEventListener('DOMContentLoaded',()=>{const saved=localStorage.getItem('ig_admin_pw');if(saved){adminPassword=saved;apiGet('/api/admin/stats').then(r=>{if(r.success){document.getElementById('login-screen').style.display='none';document.getElementById('dashboard').style.display='block';refreshAll()}}).catch(()=>{})}});
-async function apiGet(path){const res=await fetch(API_BASE+path,{headers:{'X-Admin-Password':adminPassword}});return res.json()}
-async function apiPost(path,body){const res=await fetch(API_BASE+path,{method:'POST',headers:{'Content-Type':'application/json','X-Admin-Password':adminPassword},body:JSON.stringify(body)});return res.json()}
+async function apiGet(path){const res=await fetch(API_BASE+path,{headers:{'X-Admin-Password':adminPassword,'X-Min-Revision':String(minRevision)}});return res.json()}
+async function apiPost(path,body){const res=await fetch(API_BASE+path,{method:'POST',headers:{'Content-Type':'application/json','X-Admin-Password':adminPassword},body:JSON.stringify(body)});const r=await res.json();if(r.revision)minRevision=Math.max(minRevision,r.revision);return r}
 async function refreshAll(){loadStats();loadKeys()}
 async function loadStats(){try{const r=await apiGet('/api/admin/stats');if(r.success){const s=r.stats;document.getElementById('s-total').textContent=s.total_keys;document.getElementById('s-active').textContent=s.active;document.getElementById('s-expired').textContent=s.expired;document.getElementById('s-revoked').textContent=s.revoked;document.getElementById('s-revenue').textContent='$'+s.monthly_revenue;document.getElementById('s-machines').textContent=s.total_machines}}catch(e){toast('Failed to load stats','error')}}
 async function loadKeys(){try{const r=await apiGet('/api/admin/keys');if(r.success){allKeys=r.keys;filterKeys()}}catch(e){toast('Failed to load keys','error')}}
-function filterKeys(){const search=document.getElementById('filter-search').value.toLowerCase();const status=document.getElementById('filter-status').value;const tier=document.getElementById('filter-tier').value;let filtered=allKeys.filter(k=>{if(search&&!k.key.toLowerCase().includes(search)&&!(k.notes||'').toLowerCase().includes(search))return false;if(status&&k.status!==status)return false;if(tier&&k.tier!==tier)return false;return true});renderKeys(filtered)}
+function filterKeys(){const search=document.getElementById('filter-search').value.trim();const status=document.getElementById('filter-status').value;const tier=document.getElementById('filter-tier').value;clearTimeout(searchTimer);if(search){searchTimer=setTimeout(()=>searchKeys(search,status,tier),250);return}let filtered=allKeys.filter(k=>{if(status&&k.status!==status)return false;if(tier&&k.tier!==tier)return false;return true});renderKeys(filtered)}
+async function searchKeys(q,status,tier){try{const r=await apiGet('/api/admin/search?q='+encodeURIComponent(q)+'&limit=100');if(r.success&&document.getElementById('filter-search').value.trim()===q){searchResults=r.keys;renderKeys(r.keys.filter(k=>(!status||k.status===status)&&(!tier||k.tier===tier)))}}catch(e){toast('Search failed','error')}}
 function renderKeys(keys){const tbody=document.getElementById('keys-tbody');const empty=document.getElementById('keys-empty');if(keys.length===0){tbody.innerHTML='';empty.style.display='block';return}empty.style.display='none';tbody.innerHTML=keys.map(k=>'<tr><td><code style="color:var(--accent);font-size:12px">'+k.key+'</code></td><td><span class="badge badge-'+k.tier+'">'+k.tier_name+'</span></td><td><span class="badge badge-'+k.status+'">'+k.status+'</span></td><td>'+k.machine_count+'/'+k.max_machines+'</td><td style="color:var(--text-dim)">'+k.created_at_human+'</td><td style="color:var(--text-dim)">'+k.expires_at_human+'</td><td style="color:var(--text-dim);max-width:120px;overflow:hidden;text-overflow:ellipsis">'+(k.notes||'\u2014')+'</td><td><button class="btn btn-info btn-sm" onclick="showDetails(\''+k.key+'\')" title="Details">&#128269;</button> <button class="btn btn-warning btn-sm" onclick="showExtend(\''+k.key+'\')" title="Extend">&#9200;</button> '+(k.status==='active'?'<button class="btn btn-danger btn-sm" onclick="doRevoke(\''+k.key+'\')" title="Revoke">&#128683;</button> ':'')+(k.status==='revoked'?'<button class="btn btn-success btn-sm" onclick="doUnrevoke(\''+k.key+'\')" title="Re-activate">&#9989;</button> ':'')+'<button class="btn btn-danger btn-sm" onclick="doDelete(\''+k.key+'\')" title="Delete">&#128465;</button></td></tr>').join('')}
 async function generateKey(){const btn=document.getElementById('gen-btn');btn.innerHTML='<div class="spinner"></div> Generating...';btn.disabled=true;try{const r=await apiPost('/api/admin/generate',{tier:document.getElementById('gen-tier').value,duration_days:parseInt(document.getElementById('gen-duration').value),max_machines:parseInt(document.getElementById('gen-machines').value),notes:document.getElementById('gen-notes').value});if(r.success){document.getElementById('gen-key-text').textContent=r.key;document.getElementById('generated-key-result').style.display='block';toast('License key generated!','success');refreshAll()}else{toast(r.error||'Failed to generate','error')}}catch(e){toast('Network error','error')}btn.innerHTML='&#128273; Generate Key';btn.disabled=false}
 function copyKey(){const key=document.getElementById('gen-key-text').textContent;navigator.clipboard.writeText(key).then(()=>toast('Key copied!','success'))}
-function showDetails(key){const k=allKeys.find(x=>x.key===key);if(!k)return;const machines=(k.machines||[]).map(m=>'<div class="machine-item"><div class="machine-info"><div><strong>'+(m.machine_name||'Unknown')+'</strong></div><div class="machine-hwid">'+m.hwid+'</div><div style="color:var(--text-dim);font-size:11px">Activated: '+new Date(m.activated_at*1000).toLocaleString()+'</div></div><button class="btn btn-danger btn-sm" onclick="doDeactivateMachine(\''+key+"','"+m.hwid+'\')">Remove</button></div>').join('')||'<p style="color:var(--text-dim);font-size:13px">No machines activated</p>';document.getElementById('modal-details-body').innerHTML='<div style="margin-bottom:16px"><div style="font-size:12px;color:var(--text-dim)">License Key</div><div style="font-family:monospace;font-size:16px;color:var(--accent);margin:4px 0">'+k.key+'</div></div><div style="display:grid;grid-template-columns:1fr 1fr;gap:12px;margin-bottom:20px"><div><span style="color:var(--text-dim);font-size:12px">Tier</span><br><span class="badge badge-'+k.tier+'">'+k.tier_name+'</span></div><div><span style="color:var(--text-dim);font-size:12px">Status</span><br><span class="badge badge-'+k.status+'">'+k.status+'</span></div><div><span style="color:var(--text-dim);font-size:12px">Created</span><br>'+k.created_at_human+'</div><div><span style="color:var(--text-dim);font-size:12px">Expires</span><br>'+k.expires_at_human+'</div><div><span style="color:var(--text-dim);font-size:12px">Machines</span><br>'+k.machine_count+'/'+k.max_machines+'</div><div><span style="color:var(--text-dim);font-size:12px">Last Validated</span><br>'+(k.last_validated?new Date(k.last_validated*1000).toLocaleString():'Never')+'</div></div>'+(k.notes?'<div style="margin-bottom:16px"><span style="color:var(--text-dim);font-size:12px">Notes</span><br>'+k.notes+'</div>':'')+'<h4 style="font-size:14px;margin-bottom:10px">&#128187; Activated Machines</h4>'+machines;openModal('modal-details')}
+function showDetails(key){const k=allKeys.find(x=>x.key===key)||searchResults.find(x=>x.key===key);if(!k)return;const machines=(k.machines||[]).map(m=>'<div class="machine-item"><div class="machine-info"><div><strong>'+(m.machine_name||'Unknown')+'</strong></div><div class="machine-hwid">'+m.hwid+'</div><div style="color:var(--text-dim);font-size:11px">Activated: '+new Date(m.activated_at*1000).toLocaleString()+'</div></div><button class="btn btn-danger btn-sm" onclick="doDeactivateMachine(\''+key+"','"+m.hwid+'\')">Remove</button></div>').join('')||'<p style="color:var(--text-dim);font-size:13px">No machines activated</p>';document.getElementById('modal-details-body').innerHTML='<div style="margin-bottom:16px"><div style="font-size:12px;color:var(--text-dim)">License Key</div><div style="font-family:monospace;font-size:16px;color:var(--accent);margin:4px 0">'+k.key+'</div></div><div style="display:grid;grid-template-columns:1fr 1fr;gap:12px;margin-bottom:20px"><div><span style="color:var(--text-dim);font-size:12px">Tier</span><br><span class="badge badge-'+k.tier+'">'+k.tier_name+'</span></div><div><span style="color:var(--text-dim);font-size:12px">Status</span><br><span class="badge badge-'+k.status+'">'+k.status+'</span></div><div><span style="color:var(--text-dim);font-size:12px">Created</span><br>'+k.created_at_human+'</div><div><span style="color:var(--text-dim);font-size:12px">Expires</span><br>'+k.expires_at_human+'</div><div><span style="color:var(--text-dim);font-size:12px">Machines</span><br>'+k.machine_count+'/'+k.max_machines+'</div><div><span style="color:var(--text-dim);font-size:12px">Last Validated</span><br>'+(k.last_validated?new Date(k.last_validated*1000).toLocaleString():'Never')+'</div></div>'+(k.notes?'<div style="margin-bottom:16px"><span style="color:var(--text-dim);font-size:12px">Notes</span><br>'+k.notes+'</div>':'')+'<h4 style="font-size:14px;margin-bottom:10px">&#128187; Activated Machines</h4>'+machines;openModal('modal-details')}
 function showExtend(key){currentActionKey=key;document.getElementById('extend-key-display').textContent=key;document.getElementById('extend-days').value=30;openModal('modal-extend')}
 async function doExtend(){const btn=document.getElementById('extend-btn');btn.innerHTML='<div class="spinner"></div>';btn.disabled=true;try{const r=await apiPost('/api/admin/extend',{key:currentActionKey,days:parseInt(document.getElementById('extend-days').value)});if(r.success){toast(r.message,'success');closeModal('modal-extend');refreshAll()}else{toast(r.error,'error')}}catch(e){toast('Network error','error')}btn.innerHTML='&#9200; Extend';btn.disabled=false}
 async function doRevoke(key){if(!confirm('Revoke license '+key+'?'))return;try{const r=await apiPost('/api/admin/revoke',{key});toast(r.success?'License revoked':r.error,r.success?'success':'error');refreshAll()}catch(e){toast('Network error','error')}}
@@ -320,16 +337,404 @@ TIERS = {
     }
 }
 
-# ==================== HELPERS ====================
+# ==================== LICENSE CODEC ====================
+# Stored license formats:
+#   v1 — plain json.dumps(license), always starts with "{"
+#   v2 — "2|" + compact JSON with short field names, integer timestamps and
+#        default-valued fields omitted (the key itself is implied by the Redis key)
+# Both are read transparently and every save writes v2. Validate no longer saves,
+# so its heartbeat write also rewrites a v1 record it just read — compare-and-set
+# on the primary, so a stale replica read never overwrites newer data. The
+# migrate_codec job converts every remaining record in one pass.
+# Values must stay UTF-8 text: the Upstash REST client JSON-encodes commands
+# and decodes every response as a string.
+
+LICENSE_CODEC_VERSION = 2
+_V2_PREFIX = "2|"
+
+# SET KEYS[1] ARGV[2] only if it still holds ARGV[1]
+_REWRITE_IF_UNCHANGED = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+_LICENSE_FIELDS = {
+    "tier": "t", "created_at": "c", "expires_at": "e", "revoked": "r",
+    "revoked_at": "ra", "machines": "m", "max_machines_override": "mo",
+    "last_validated": "lv", "notes": "n",
+}
+_MACHINE_FIELDS = {"hwid": "h", "machine_name": "n", "activated_at": "a"}
+_LICENSE_FIELDS_REV = {v: k for k, v in _LICENSE_FIELDS.items()}
+_MACHINE_FIELDS_REV = {v: k for k, v in _MACHINE_FIELDS.items()}
+_TIMESTAMP_FIELDS = {"created_at", "expires_at", "revoked_at", "last_validated", "activated_at"}
+_LICENSE_DEFAULTS = {
+    "revoked": False, "machines": [], "max_machines_override": None,
+    "last_validated": None, "notes": "",
+}
+
+
+def _pack_fields(data, names, defaults):
+    packed = {}
+    for field, value in data.items():
+        if field in defaults and value == defaults[field]:
+            continue
+        if field in _TIMESTAMP_FIELDS and isinstance(value, float):
+            value = int(round(value))
+        packed[names.get(field, field)] = value
+    return packed
+
+
+def _unpack_fields(packed, names):
+    return {names.get(field, field): value for field, value in packed.items()}
+
+
+def encode_license(data):
+    """License dict -> v2 string"""
+    packed = _pack_fields({k: v for k, v in data.items() if k != "key"}, _LICENSE_FIELDS, _LICENSE_DEFAULTS)
+    if "m" in packed:
+        packed["m"] = [_pack_fields(m, _MACHINE_FIELDS, {}) for m in packed["m"]]
+    return _V2_PREFIX + json.dumps(packed, separators=(",", ":"), ensure_ascii=False)
+
+
+def is_v1_license(raw):
+    """True for a stored record still in the plain-JSON v1 format"""
+    return isinstance(raw, str) and raw.startswith("{")
+
+
+def decode_license(raw, key=None):
+    """v1 or v2 string (or an already-decoded dict) -> license dict"""
+    if not raw:
+        return None
+    if not isinstance(raw, str):
+        return raw
+    if not raw.startswith(_V2_PREFIX):
+        lic = json.loads(raw)
+        if key is not None:
+            lic.setdefault("key", key)
+        return lic
+
+    lic = _unpack_fields(json.loads(raw[len(_V2_PREFIX):]), _LICENSE_FIELDS_REV)
+    for field, default in _LICENSE_DEFAULTS.items():
+        lic.setdefault(field, list(default) if isinstance(default, list) else default)
+    lic["machines"] = [_unpack_fields(m, _MACHINE_FIELDS_REV) for m in lic["machines"]]
+    if key is not None:
+        lic["key"] = key
+    return lic
+
+
+# ==================== REDIS ROUTING ====================
+# Writes always go to the primary (UPSTASH_REDIS_REST_URL). Read-only paths may be
+# served by read replicas listed in UPSTASH_REDIS_READ_REPLICAS as comma-separated
+# "url" or "url|token" entries (token defaults to the primary's).
+#
+# Every endpoint tracks an EWMA of latency and error rate; reads go to the
+# lowest-scoring healthy endpoint. Each license write bumps license_revision on the
+# primary: admin mutations return it, and admin reads that send X-Min-Revision are
+# only served by an endpoint that has replicated at least that far (read-your-writes).
+# A replica that stays behind a revision the primary reached more than
+# READ_REPLICA_MAX_STALENESS seconds ago is taken out of rotation until it catches up.
+# Revision probes run in the background every READ_REPLICA_PROBE_SECONDS, so the
+# validate path never waits on them; latency is sampled from the reads themselves.
+
+READ_REPLICA_MAX_STALENESS = float(os.environ.get("READ_REPLICA_MAX_STALENESS", "5"))
+READ_REPLICA_PROBE_SECONDS = float(os.environ.get("READ_REPLICA_PROBE_SECONDS", "10"))
+ENDPOINT_EWMA_ALPHA = 0.2
+ENDPOINT_MAX_ERROR_RATE = 0.5
+
+# Latency bounds — every REST call has a deadline, an endpoint that keeps failing
+# trips a circuit breaker and fails fast, and reads can be hedged to a second endpoint.
+REDIS_TIMEOUT_SECONDS = float(os.environ.get("REDIS_TIMEOUT_SECONDS", "1.0"))
+REDIS_RETRIES = int(os.environ.get("REDIS_RETRIES", "0"))
+REDIS_HEDGE_AFTER_SECONDS = float(os.environ.get("REDIS_HEDGE_AFTER_MS", "150")) / 1000
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.environ.get("CIRCUIT_RESET_SECONDS", "10"))
+
+_hedge_pool = ThreadPoolExecutor(max_workers=8)
+
+
+class RedisUnavailable(Exception):
+    """Redis could not be reached in time (timeout, transport error or open circuit)"""
+
+
+class DeadlineSession(Session):
+    """requests Session that applies a default timeout to every call"""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(*args, **kwargs)
+
+
+class TrackedPipeline(Pipeline):
+    """Pipeline that goes through the owning TrackedRedis' deadline and circuit breaker"""
+
+    def __init__(self, tracker, **kwargs):
+        super().__init__(**kwargs)
+        self._tracker = tracker
+
+    def queued(self):
+        """Index the next queued command's result will have in exec()"""
+        return len(self._command_stack)
+
+    def exec(self):
+        return self._tracker.call(lambda: Pipeline.exec(self))
+
+
+class TrackedRedis(Redis):
+    """Upstash client with a per-call deadline, a circuit breaker, and
+    per-endpoint latency / error tracking for read routing"""
+
+    def __init__(self, name, url, token):
+        super().__init__(url=url, token=token, rest_retries=REDIS_RETRIES, rest_retry_interval=0.05)
+        self._session = DeadlineSession(REDIS_TIMEOUT_SECONDS)
+        self.name = name
+        self.latency_ewma = None
+        self.error_ewma = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.circuit_opened_at = None
+        self.trial_in_flight = False
+        self._trial_lock = threading.Lock()
+        self.revision = None
+        self.probed_at = 0
+        self.probing = False
+
+    def circuit_state(self):
+        if self.circuit_opened_at is None:
+            return "closed"
+        if time.time() - self.circuit_opened_at < CIRCUIT_RESET_SECONDS:
+            return "open"
+        return "half-open"
+
+    def record(self, started, ok):
+        self.calls += 1
+        sample = 0.0 if ok else 1.0
+        self.error_ewma += ENDPOINT_EWMA_ALPHA * (sample - self.error_ewma)
+        if not ok:
+            self.errors += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+                self.circuit_opened_at = time.time()
+            return
+        self.consecutive_failures = 0
+        self.circuit_opened_at = None
+        latency = time.perf_counter() - started
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += ENDPOINT_EWMA_ALPHA * (latency - self.latency_ewma)
+
+    def call(self, fn):
+        """Run one REST round trip — transport failures become RedisUnavailable"""
+        state = self.circuit_state()
+        if state == "open":
+            raise RedisUnavailable(f"{self.name}: circuit open")
+        trial = state == "half-open"
+        if trial:
+            # One trial call decides whether the circuit closes; the rest keep failing fast
+            with self._trial_lock:
+                if self.trial_in_flight:
+                    raise RedisUnavailable(f"{self.name}: circuit half-open, trial in progress")
+                self.trial_in_flight = True
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except UpstashError:
+            # The endpoint answered — a command error is not an availability problem
+            self.record(started, ok=True)
+            raise
+        except Exception as e:
+            self.record(started, ok=False)
+            raise RedisUnavailable(f"{self.name}: {e}") from e
+        finally:
+            if trial:
+                self.trial_in_flight = False
+        self.record(started, ok=True)
+        return result
+
+    def execute(self, command):
+        return self.call(lambda: Redis.execute(self, command))
+
+    def _pipeline(self, multi_exec):
+        return TrackedPipeline(
+            self, url=self._url, token=self._token, rest_encoding=self._rest_encoding,
+            rest_retries=self._rest_retries, rest_retry_interval=self._rest_retry_interval,
+            allow_telemetry=self._allow_telemetry, headers=self._headers,
+            session=self._session, multi_exec=multi_exec
+        )
+
+    def pipeline(self):
+        return self._pipeline("pipeline")
+
+    def multi(self):
+        return self._pipeline("multi-exec")
+
+    def score(self):
+        """Lower is better — unsampled endpoints go first so they get measured"""
+        if self.latency_ewma is None:
+            return 0.0
+        return self.latency_ewma * (1 + 4 * self.error_ewma)
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "url": self._url,
+            "calls": self.calls,
+            "errors": self.errors,
+            "latency_ms": round(self.latency_ewma * 1000, 2) if self.latency_ewma is not None else None,
+            "error_rate": round(self.error_ewma, 4),
+            "circuit": self.circuit_state(),
+            "revision": self.revision,
+            "stale": endpoint_is_stale(self),
+        }
+
+
+_endpoints = {"primary": None, "replicas": []}
+_primary_revisions = deque(maxlen=64)  # (revision, first seen at) as observed on the primary
+
+
+def _load_endpoints():
+    token = os.environ.get("UPSTASH_REDIS_REST_TOKEN", "").strip()
+    _endpoints["primary"] = TrackedRedis("primary", os.environ.get("UPSTASH_REDIS_REST_URL", "").strip(), token)
+    replicas = []
+    for i, entry in enumerate(e.strip() for e in os.environ.get("UPSTASH_REDIS_READ_REPLICAS", "").split(",")):
+        if not entry:
+            continue
+        url, _, replica_token = entry.partition("|")
+        replicas.append(TrackedRedis(f"replica-{i + 1}", url.strip(), replica_token.strip() or token))
+    _endpoints["replicas"] = replicas
+
 
 def get_redis():
-    """Get Upstash Redis client"""
-    return Redis(
-        url=os.environ.get("UPSTASH_REDIS_REST_URL", "").strip(),
-        token=os.environ.get("UPSTASH_REDIS_REST_TOKEN", "").strip()
-    )
+    """Get the primary Upstash Redis client — use for anything that writes"""
+    if _endpoints["primary"] is None:
+        _load_endpoints()
+    return _endpoints["primary"]
 
 
+def note_primary_revision(revision):
+    """Remember when the primary was first seen at a revision"""
+    if not _primary_revisions or revision > _primary_revisions[-1][0]:
+        _primary_revisions.append((revision, time.time()))
+
+
+def endpoint_is_stale(endpoint):
+    """True if a replica is still behind a revision the primary reached too long ago"""
+    if endpoint.revision is None or endpoint is _endpoints["primary"]:
+        return False
+    for revision, seen_at in _primary_revisions:
+        if revision > endpoint.revision:
+            return time.time() - seen_at > READ_REPLICA_MAX_STALENESS
+    return False
+
+
+def probe_endpoint(endpoint):
+    """Read license_revision from an endpoint — refreshes its revision and latency"""
+    endpoint.probed_at = time.time()
+    try:
+        endpoint.revision = int(endpoint.get("license_revision") or 0)
+    except (RedisUnavailable, UpstashError):
+        return
+    finally:
+        endpoint.probing = False
+    if endpoint is _endpoints["primary"]:
+        note_primary_revision(endpoint.revision)
+
+
+def schedule_probe(endpoint):
+    """Probe an endpoint on the background pool unless a probe is already running"""
+    if endpoint.probing:
+        return
+    endpoint.probing = True
+    endpoint.probed_at = time.time()
+    _hedge_pool.submit(probe_endpoint, endpoint)
+
+
+def read_candidates(min_revision=None):
+    """Endpoints a read may use, best first — the primary is always included"""
+    primary = get_redis()
+    replicas = _endpoints["replicas"]
+    if not replicas:
+        return [primary]
+
+    now = time.time()
+    for endpoint in [primary] + replicas:
+        if now - endpoint.probed_at >= READ_REPLICA_PROBE_SECONDS:
+            schedule_probe(endpoint)
+
+    candidates = [primary] + [
+        r for r in replicas
+        if r.error_ewma < ENDPOINT_MAX_ERROR_RATE and r.circuit_state() != "open" and not endpoint_is_stale(r)
+    ]
+    usable = []
+    for endpoint in sorted(candidates, key=lambda e: e.score()):
+        if endpoint is not primary and min_revision:
+            # Admin reads only: one synchronous re-probe beats falling back to the primary
+            if (endpoint.revision or 0) < min_revision and endpoint.probed_at < now:
+                probe_endpoint(endpoint)
+            if (endpoint.revision or 0) < min_revision:
+                continue
+        usable.append(endpoint)
+    return usable
+
+
+def get_read_redis(min_revision=None):
+    """Client for a read-only path — the best healthy replica, or the primary"""
+    return read_candidates(min_revision)[0]
+
+
+def hedged_read(fn, candidates):
+    """Run fn(client) on the best endpoint; if it has not answered within
+    REDIS_HEDGE_AFTER_SECONDS (or failed), race it against the next one.
+
+    Returns (result, endpoint that answered).
+    """
+    best = candidates[0]
+    if len(candidates) == 1 or REDIS_HEDGE_AFTER_SECONDS <= 0:
+        # Nothing to race against — a hedge would only repeat the read on the same endpoint
+        return fn(best), best
+    backup = candidates[1]
+
+    first = _hedge_pool.submit(fn, best)
+    try:
+        return first.result(timeout=REDIS_HEDGE_AFTER_SECONDS), best
+    except FutureTimeout:
+        pass
+    except RedisUnavailable:
+        return fn(backup), backup
+
+    second = _hedge_pool.submit(fn, backup)
+    error = None
+    for future in as_completed([first, second]):
+        try:
+            return future.result(), best if future is first else backup
+        except RedisUnavailable as e:
+            error = e
+    raise error
+
+
+def request_min_revision(req):
+    """Revision the admin client last wrote, from the X-Min-Revision header"""
+    try:
+        return int(req.headers.get("X-Min-Revision", 0))
+    except ValueError:
+        return 0
+
+
+def endpoint_stats():
+    get_redis()
+    return [e.stats() for e in [_endpoints["primary"]] + _endpoints["replicas"]]
+
+
+# ==================== HELPERS ====================
+
 def generate_key():
     """Generate license key: IGTOOL-XXXX-XXXX-XXXX-XXXX"""
     parts = [uuid.uuid4().hex[:4].upper() for _ in range(4)]
@@ -350,24 +755,899 @@ def cors_response(data, status=200):
     resp = jsonify(data)
     resp.status_code = status
     resp.headers["Access-Control-Allow-Origin"] = "*"
-    resp.headers["Access-Control-Allow-Headers"] = "Content-Type, X-Admin-Password"
+    resp.headers["Access-Control-Allow-Headers"] = "Content-Type, X-Admin-Password, X-Min-Revision"
     resp.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS, DELETE"
     return resp
 
 
 def get_license(redis, key):
     """Fetch and parse license data from Redis"""
-    raw = redis.get(f"license:{key}")
+    return decode_license(redis.get(f"license:{key}"), key)
+
+
+def get_licenses(redis, keys):
+    """Fetch several licenses in one round trip — returns {key: lic}"""
+    keys = list(keys)
+    if not keys:
+        return {}
+    raws = redis.mget(*[f"license:{k}" for k in keys])
+    result = {}
+    for key, raw in zip(keys, raws):
+        lic = decode_license(raw, key)
+        if lic:
+            result[key] = lic
+    return result
+
+
+def bump_revision(redis):
+    """Advance license_revision once every write of a change has landed — returns it"""
+    revision = redis.incr("license_revision")
+    note_primary_revision(revision)
+    return revision
+
+
+def save_license(redis, key, data, bump=True):
+    """Save license data to Redis — returns the new license_revision
+    (bump=False when more writes follow; call bump_revision after them)"""
+    if not bump:
+        redis.set(f"license:{key}", encode_license(data))
+        return None
+    pipe = redis.pipeline()
+    pipe.set(f"license:{key}", encode_license(data))
+    pipe.incr("license_revision")
+    revision = pipe.exec()[-1]
+    note_primary_revision(revision)
+    return revision
+
+
+def get_last_validated(redis, keys):
+    """{key: last validate time} from the license_last_validated hash"""
+    keys = list(keys)
+    if not keys:
+        return {}
+    values = redis.hmget("license_last_validated", *keys)
+    return {k: float(v) for k, v in zip(keys, values) if v is not None}
+
+
+def validation_error(lic, hwid):
+    """Why a license does not validate for a machine, or None"""
+    if not lic:
+        return "Invalid license key"
+    if lic.get("revoked"):
+        return "License has been revoked"
+    if time.time() > lic.get("expires_at", 0):
+        return "License has expired"
+    if hwid not in [m["hwid"] for m in lic.get("machines", [])]:
+        return "Machine not activated"
+    return None
+
+
+def license_status(lic):
+    """active / expired / revoked"""
+    if lic.get("revoked"):
+        return "revoked"
+    if time.time() > lic.get("expires_at", 0):
+        return "expired"
+    return "active"
+
+
+def license_stat_counts(lic):
+    """What one license contributes to the dashboard stats"""
+    tier = lic.get("tier", "basic")
+    status = license_status(lic)
+    counts = {"total_keys": 1, tier: 1, status: 1, "total_machines": len(lic.get("machines", []))}
+    if status == "active":
+        counts["monthly_revenue"] = TIERS.get(tier, {}).get("price", 0)
+    return counts
+
+
+def license_summary(key, lic, last_validated=None):
+    """License record as shown in the admin dashboard"""
+    tier = lic.get("tier", "basic")
+    tier_info = TIERS.get(tier, TIERS["basic"])
+    expires_at = lic.get("expires_at", 0)
+
+    return {
+        "key": key,
+        "tier": tier,
+        "tier_name": tier_info["name"],
+        "status": license_status(lic),
+        "created_at": lic.get("created_at", 0),
+        "created_at_human": datetime.fromtimestamp(lic.get("created_at", 0)).strftime("%Y-%m-%d %H:%M") if lic.get("created_at") else "N/A",
+        "expires_at": expires_at,
+        "expires_at_human": datetime.fromtimestamp(expires_at).strftime("%Y-%m-%d %H:%M") if expires_at else "N/A",
+        "machines": lic.get("machines", []),
+        "machine_count": len(lic.get("machines", [])),
+        "max_machines": lic.get("max_machines_override") or tier_info["max_machines"],
+        "last_validated": max(filter(None, [lic.get("last_validated"), last_validated]), default=None),
+        "notes": lic.get("notes", "")
+    }
+
+
+# ==================== SEARCH INDEX ====================
+# Maintained on every write that changes searchable fields:
+#   idx:keys        — sorted set (all scores 0) of license keys, for BYLEX prefix lookups
+#   idx:hwid:{hwid} — set of license keys the machine is activated on
+#   idx:terms       — sorted set (all scores 0) of every indexed word, for prefix expansion
+#   idx:tok:{word}  — set of license keys whose notes / machine names contain the word,
+#                     or whose key has it as a segment ("IGTOOL-9148-..." -> "9148")
+# A word leaves idx:terms when its last license does. Adding writes the word's set
+# before idx:terms and removal checks the set atomically, so a concurrent add
+# never ends up with its word missing from idx:terms.
+
+KEY_PREFIX = "IGTOOL-"
+SEARCH_MAX_LIMIT = 100
+SEARCH_TERM_EXPANSION = 20
+
+# SREM KEYS[1] ARGV[2]; if the set is now empty, ZREM KEYS[2] ARGV[1]
+_DROP_INDEX_TERM = """
+redis.call('SREM', KEYS[1], ARGV[2])
+if redis.call('SCARD', KEYS[1]) == 0 then
+    redis.call('ZREM', KEYS[2], ARGV[1])
+end
+return 1
+"""
+
+
+def tokenize(text):
+    """Lowercase alphanumeric words of 2+ chars"""
+    return [t for t in re.findall(r"[a-z0-9]+", (text or "").lower()) if len(t) >= 2]
+
+
+def license_index_terms(lic):
+    """(hwids, words) a license is indexed under"""
+    if not lic:
+        return set(), set()
+    machines = lic.get("machines", [])
+    hwids = {m["hwid"] for m in machines}
+    words = set(tokenize(lic.get("notes", "")))
+    for m in machines:
+        words.update(tokenize(m.get("machine_name", "")))
+    return hwids, words
+
+
+def key_segment_terms(key):
+    """Lowercased segments of a license key after the IGTOOL- prefix"""
+    return set(tokenize(key[len(KEY_PREFIX):] if key.startswith(KEY_PREFIX) else key))
+
+
+def update_license_index(redis, key, lic, previous=None):
+    """Bring the search index in line with `lic`, dropping terms only `previous` had"""
+    new_hwids, new_words = license_index_terms(lic)
+    old_hwids, old_words = license_index_terms(previous)
+    new_words |= key_segment_terms(key)
+    if previous:
+        old_words |= key_segment_terms(key)
+
+    pipe = redis.pipeline()
+    pipe.zadd("idx:keys", {key: 0})
+    for hwid in new_hwids - old_hwids:
+        pipe.sadd(f"idx:hwid:{hwid}", key)
+    for hwid in old_hwids - new_hwids:
+        pipe.srem(f"idx:hwid:{hwid}", key)
+    for word in new_words - old_words:
+        pipe.sadd(f"idx:tok:{word}", key)
+    if new_words:
+        pipe.zadd("idx:terms", {w: 0 for w in new_words})
+    for word in old_words - new_words:
+        _drop_index_term(pipe, word, key)
+    pipe.exec()
+
+
+def _drop_index_term(pipe, word, key):
+    pipe.eval(_DROP_INDEX_TERM, keys=[f"idx:tok:{word}", "idx:terms"], args=[word, key])
+
+
+def remove_license_index(redis, key, lic):
+    """Remove a license from every index it appears in"""
+    hwids, words = license_index_terms(lic)
+    words |= key_segment_terms(key)
+    pipe = redis.pipeline()
+    pipe.zrem("idx:keys", key)
+    for hwid in hwids:
+        pipe.srem(f"idx:hwid:{hwid}", key)
+    for word in words:
+        _drop_index_term(pipe, word, key)
+    pipe.exec()
+
+
+def keys_for_hwid(redis, hwid):
+    """License keys a machine is activated on"""
+    return redis.smembers(f"idx:hwid:{hwid}") or []
+
+
+def search_license_keys(redis, query, limit):
+    """Match a query against HWIDs, key prefixes or segments and notes / machine-name
+    word prefixes.
+
+    Costs at most three pipelined round trips, and reads at most `limit` keys per
+    expanded word, however many licenses share it.
+    """
+    query = query.strip()
+    if not query:
+        return []
+
+    key_prefix = query.upper()
+    if not key_prefix.startswith(KEY_PREFIX) and not KEY_PREFIX.startswith(key_prefix):
+        key_prefix = KEY_PREFIX + key_prefix
+
+    words = tokenize(query)
+    full_words, last_word = words[:-1], words[-1] if words else None
+
+    pipe = redis.pipeline()
+    pipe.smembers(f"idx:hwid:{query}")
+    pipe.zrange("idx:keys", f"[{key_prefix}", f"[{key_prefix}\xff", sortby="BYLEX", offset=0, count=limit)
+    if last_word:
+        pipe.zrange("idx:terms", f"[{last_word}", f"[{last_word}\xff", sortby="BYLEX",
+                    offset=0, count=SEARCH_TERM_EXPANSION)
+    results = pipe.exec()
+
+    hwid_hits, key_hits = results[0] or [], results[1] or []
+    word_hits = []
+    expansions = results[2] if last_word else []
+    if expansions:
+        # A common word ("trial") can be on every license — take one page per word
+        pipe = redis.pipeline()
+        for word in expansions:
+            pipe.sscan(f"idx:tok:{word}", 0, count=limit)
+        candidates = set()
+        for page in pipe.exec():
+            candidates.update(page[1][:limit])
+        word_hits = sorted(candidates)
+        if full_words and word_hits:
+            pipe = redis.pipeline()
+            for word in full_words:
+                pipe.smismember(f"idx:tok:{word}", *word_hits)
+            found = pipe.exec()
+            word_hits = [key for i, key in enumerate(word_hits) if all(hits[i] for hits in found)]
+
+    matches = []
+    seen = set()
+    for key in list(hwid_hits) + list(key_hits) + word_hits:
+        if key not in seen:
+            seen.add(key)
+            matches.append(key)
+    return matches[:limit]
+
+
+# ==================== MACHINE SEATS ====================
+# Per-machine last-seen tracking, refreshed by /api/validate (the app's heartbeat):
+#   machines_seen:{key} — hash hwid -> last seen timestamp, one per license
+#   machine_last_seen   — sorted set "{key}|{hwid}" scored by last seen, for sweeps
+# With SEAT_INACTIVITY_DAYS > 0, activating on a license that is full reclaims the
+# seat of the machine not seen for longest, if it has been inactive that long, and
+# /api/admin/sweep-machines prunes inactive machines across all licenses in batches.
+
+SEAT_INACTIVITY_DAYS = float(os.environ.get("SEAT_INACTIVITY_DAYS", "30"))
+HEARTBEAT_WRITE_SECONDS = float(os.environ.get("HEARTBEAT_WRITE_SECONDS", "300"))
+HEARTBEAT_CACHE_MAX = 10000
+SWEEP_MAX_BATCH = 500
+
+_heartbeats = OrderedDict()
+
+
+def _seat_member(key, hwid):
+    return f"{key}|{hwid}"
+
+
+def touch_machines(redis, key, hwids, seen_at=None, only_new=False):
+    """Record machines as seen — only_new leaves existing timestamps alone (backfill)"""
+    hwids = list(hwids)
+    if not hwids:
+        return
+    seen_at = int(seen_at or time.time())
+    pipe = redis.pipeline()
+    for hwid in hwids:
+        if only_new:
+            pipe.hsetnx(f"machines_seen:{key}", hwid, seen_at)
+        else:
+            pipe.hset(f"machines_seen:{key}", hwid, seen_at)
+    pipe.zadd("machine_last_seen", {_seat_member(key, h): seen_at for h in hwids}, nx=only_new)
+    pipe.exec()
+
+
+def forget_machines(redis, key, hwids):
+    """Drop machines from last-seen tracking"""
+    hwids = list(hwids)
+    if not hwids:
+        return
+    pipe = redis.pipeline()
+    pipe.hdel(f"machines_seen:{key}", *hwids)
+    pipe.zrem("machine_last_seen", *[_seat_member(key, h) for h in hwids])
+    pipe.exec()
+
+
+def record_heartbeat(redis, key, hwid, raw=None):
+    """Validate-time heartbeat — written at most once per HEARTBEAT_WRITE_SECONDS per machine and instance.
+    raw is the stored record validate read; a v1 record is migrated to v2 in the same pipeline"""
+    now = time.time()
+    last = _heartbeats.get((key, hwid))
+    if last is not None and now - last < HEARTBEAT_WRITE_SECONDS:
+        return
+    pipe = redis.pipeline()
+    # Kept out of the license document so a stale replica read is never written back
+    pipe.hset("license_last_validated", key, int(now))
+    pipe.hset(f"machines_seen:{key}", hwid, int(now))
+    pipe.zadd("machine_last_seen", {_seat_member(key, hwid): int(now)})
+    if is_v1_license(raw):
+        # Same content in the new format, so license_revision is not bumped
+        pipe.eval(_REWRITE_IF_UNCHANGED, keys=[f"license:{key}"],
+                  args=[raw, encode_license(decode_license(raw, key))])
+    pipe.exec()
+
+    _heartbeats[(key, hwid)] = now
+    _heartbeats.move_to_end((key, hwid))
+    while len(_heartbeats) > HEARTBEAT_CACHE_MAX:
+        _heartbeats.popitem(last=False)
+
+
+def machine_seen_seeds(redis, key, lic, last_validated=None):
+    """{hwid: fallback last seen} for machines never seen — the latest of activation and
+    the license's own last validation, so a long-activated machine still in use is not
+    counted as inactive"""
+    if last_validated is None:
+        last_validated = redis.hget("license_last_validated", key)
+    floor = max(float(lic.get("last_validated") or 0), float(last_validated or 0))
+    return {m["hwid"]: max(float(m.get("activated_at") or 0), floor) for m in lic.get("machines", [])}
+
+
+def machine_last_seen(redis, key, lic):
+    """{hwid: last seen} — falls back to machine_seen_seeds for machines never seen"""
+    pipe = redis.pipeline()
+    pipe.hgetall(f"machines_seen:{key}")
+    pipe.hget("license_last_validated", key)
+    seen, last_validated = pipe.exec()
+    seen = seen or {}
+    seeds = machine_seen_seeds(redis, key, lic, last_validated or 0)
+    return {hwid: float(seen.get(hwid) or seed) for hwid, seed in seeds.items()}
+
+
+def backfill_machines_seen(redis, key, lic):
+    """Seed last-seen tracking for machines that have none yet (reindex)"""
+    for hwid, seed in machine_seen_seeds(redis, key, lic).items():
+        touch_machines(redis, key, [hwid], seed, only_new=True)
+
+
+def stalest_inactive_machine(redis, key, lic):
+    """The machine not seen for longest, if it has been inactive past the policy"""
+    machines = lic.get("machines", [])
+    if SEAT_INACTIVITY_DAYS <= 0 or not machines:
+        return None
+    last_seen = machine_last_seen(redis, key, lic)
+    stalest = min(machines, key=lambda m: last_seen[m["hwid"]])
+    if time.time() - last_seen[stalest["hwid"]] < SEAT_INACTIVITY_DAYS * 86400:
+        return None
+    return stalest
+
+
+def sweep_inactive_machines(redis, batch_size):
+    """Remove up to batch_size inactive machines, oldest first — returns (pruned, more)"""
+    cutoff = time.time() - SEAT_INACTIVITY_DAYS * 86400
+    members = redis.zrange("machine_last_seen", "-inf", cutoff, sortby="BYSCORE",
+                           offset=0, count=batch_size) or []
+
+    stale = {}
+    for member in members:
+        key, _, hwid = member.partition("|")
+        stale.setdefault(key, set()).add(hwid)
+
+    pruned = []
+    licenses = get_licenses(redis, stale)
+    for key, hwids in stale.items():
+        lic = licenses.get(key)
+        if lic:
+            previous = copy.deepcopy(lic)
+            lic["machines"] = [m for m in lic.get("machines", []) if m["hwid"] not in hwids]
+            removed = {m["hwid"] for m in previous.get("machines", [])} - {m["hwid"] for m in lic["machines"]}
+            if removed:
+                update_license_index(redis, key, lic, previous)
+                save_license(redis, key, lic)
+                pruned.extend({"key": key, "hwid": h} for h in sorted(removed))
+        forget_machines(redis, key, hwids)
+
+    return pruned, len(members) == batch_size
+
+
+# ==================== KEY FILTER ====================
+# Rejects license keys that were never issued without a Redis round trip:
+#   1. strict format check against generate_key()
+#   2. in-process Bloom filter of every issued key (built from all_license_keys)
+#   3. short-TTL negative cache of keys Redis recently reported missing
+# Other instances announce new keys by bumping license_keys_version and pushing
+# onto recent_license_keys; a Bloom miss re-syncs at most once per KEY_FILTER_SYNC_SECONDS.
+
+KEY_PATTERN = re.compile(r"IGTOOL-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{4}")
+KEY_FILTER_FP_RATE = float(os.environ.get("KEY_FILTER_FP_RATE", "0.001"))
+KEY_FILTER_SYNC_SECONDS = float(os.environ.get("KEY_FILTER_SYNC_SECONDS", "1"))
+NEGATIVE_CACHE_TTL = float(os.environ.get("NEGATIVE_CACHE_TTL", "60"))
+NEGATIVE_CACHE_MAX = 10000
+RECENT_KEYS_MAX = 1000
+KEY_FILTER_SYNC_BATCH = 100
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over one SHA-256 digest"""
+
+    def __init__(self, capacity, fp_rate):
+        self.capacity = max(int(capacity), 1)
+        self.num_bits = max(int(-self.capacity * math.log(fp_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.sha256(item.encode()).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def estimated_fp_rate(self):
+        """(1 - e^(-kn/m))^k for the current fill"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+_key_filter = {
+    "bloom": None, "version": None, "synced_at": 0,
+    "rejected_format": 0, "rejected_bloom": 0, "rejected_negative": 0, "passed": 0,
+    "failed_open": 0,
+}
+_negative_cache = OrderedDict()
+
+
+def rebuild_key_filter(redis):
+    """Rebuild the Bloom filter from all_license_keys"""
+    # One MULTI, so the version can never be ahead of the key set it describes
+    tx = redis.multi()
+    tx.get("license_keys_version")
+    tx.smembers("all_license_keys")
+    version, keys = tx.exec()
+    keys = keys or []
+    bloom = BloomFilter(max(len(keys) * 2, 1024), KEY_FILTER_FP_RATE)
+    for key in keys:
+        bloom.add(key)
+    _key_filter.update(bloom=bloom, version=int(version or 0), synced_at=time.time())
+
+
+def sync_key_filter(redis):
+    """Pick up keys issued by other instances since the last sync"""
+    bloom = _key_filter["bloom"]
+    if bloom is None or bloom.count >= bloom.capacity:
+        rebuild_key_filter(redis)
+        return
+
+    # Version and list are read in one MULTI: recent_license_keys[i] was issued at
+    # version - i, so the first `behind` entries are exactly the keys we are missing
+    tx = redis.multi()
+    tx.get("license_keys_version")
+    tx.lrange("recent_license_keys", 0, KEY_FILTER_SYNC_BATCH - 1)
+    version, recent = tx.exec()
+    version = int(version or 0)
+    recent = recent or []
+
+    behind = version - _key_filter["version"]
+    if behind < 0 or behind > len(recent):
+        rebuild_key_filter(redis)
+        return
+    for key in recent[:behind]:
+        bloom.add(key)
+    _key_filter.update(version=version, synced_at=time.time())
+
+
+def register_issued_key(redis, key):
+    """Record a newly issued key in this instance's filter and announce it to the others"""
+    tx = redis.multi()
+    tx.lpush("recent_license_keys", key)
+    tx.ltrim("recent_license_keys", 0, RECENT_KEYS_MAX - 1)
+    tx.incr("license_keys_version")
+    version = tx.exec()[-1]
+
+    bloom = _key_filter["bloom"]
+    if bloom is not None:
+        bloom.add(key)
+        if _key_filter["version"] == version - 1:
+            _key_filter["version"] = version
+    _negative_cache.pop(key, None)
+
+
+def remember_missing_key(key):
+    """Cache a key Redis just reported as missing"""
+    _negative_cache[key] = time.time() + NEGATIVE_CACHE_TTL
+    _negative_cache.move_to_end(key)
+    while len(_negative_cache) > NEGATIVE_CACHE_MAX:
+        _negative_cache.popitem(last=False)
+
+
+def key_may_exist(redis, key):
+    """False only if the key was definitely never issued (or was just looked up and missing)"""
+    if not KEY_PATTERN.fullmatch(key):
+        _key_filter["rejected_format"] += 1
+        return False
+
+    expiry = _negative_cache.get(key)
+    if expiry is not None:
+        if time.time() < expiry:
+            _key_filter["rejected_negative"] += 1
+            return False
+        del _negative_cache[key]
+
+    try:
+        if _key_filter["bloom"] is None:
+            rebuild_key_filter(redis)
+        if key not in _key_filter["bloom"] and time.time() - _key_filter["synced_at"] >= KEY_FILTER_SYNC_SECONDS:
+            sync_key_filter(redis)
+    except RedisUnavailable:
+        # The filter lives on the primary but is only an optimisation — let the
+        # read (which may be served by a replica) decide
+        _key_filter["failed_open"] += 1
+        return True
+    if key not in _key_filter["bloom"]:
+        _key_filter["rejected_bloom"] += 1
+        return False
+
+    _key_filter["passed"] += 1
+    return True
+
+
+def key_filter_stats():
+    """Bloom filter size, fill and rejection counters"""
+    bloom = _key_filter["bloom"]
+    stats = {k: v for k, v in _key_filter.items() if k != "bloom"}
+    stats["negative_cache_size"] = len(_negative_cache)
+    if bloom is not None:
+        stats.update({
+            "keys": bloom.count,
+            "capacity": bloom.capacity,
+            "bits": bloom.num_bits,
+            "hashes": bloom.num_hashes,
+            "memory_bytes": len(bloom.bits),
+            "target_fp_rate": KEY_FILTER_FP_RATE,
+            "estimated_fp_rate": bloom.estimated_fp_rate(),
+        })
+    return stats
+
+
+# ==================== STALE-IF-ERROR ====================
+# Last copy of every license this instance has read or written — valid or not, so a
+# revoke or expiry seen before an outage still holds during it. When Redis is
+# unreachable, validate re-checks that copy for up to STALE_IF_ERROR_SECONDS and
+# marks the response as degraded, instead of failing every desktop client at once.
+
+STALE_IF_ERROR_SECONDS = float(os.environ.get("STALE_IF_ERROR_SECONDS", "3600"))
+LICENSE_SNAPSHOT_MAX = 5000
+
+_license_snapshots = OrderedDict()
+_degraded = {"served": 0, "unavailable": 0}
+
+
+def remember_license_snapshot(key, lic):
+    """Keep the latest copy of a license — None (deleted) drops it"""
+    if not lic:
+        _license_snapshots.pop(key, None)
+        return
+    _license_snapshots[key] = (copy.deepcopy(lic), time.time())
+    _license_snapshots.move_to_end(key)
+    while len(_license_snapshots) > LICENSE_SNAPSHOT_MAX:
+        _license_snapshots.popitem(last=False)
+
+
+def get_license_snapshot(key):
+    """(license, age in seconds) if a snapshot within the grace period exists"""
+    entry = _license_snapshots.get(key)
+    if entry is None:
+        return None, None
+    lic, saved_at = entry
+    age = time.time() - saved_at
+    if age > STALE_IF_ERROR_SECONDS:
+        return None, None
+    return lic, age
+
+
+def degraded_stats():
+    return dict(_degraded, snapshots=len(_license_snapshots), grace_seconds=STALE_IF_ERROR_SECONDS)
+
+
+# ==================== JOBS ====================
+# Long admin operations that touch every license run as resumable jobs in bounded
+# slices, so each Vercel invocation (or scripts/job_worker.py) does a little:
+#   job:{id}        — hash: type, status, params, cursor (SSCAN position), progress
+#   job_result:{id} — hash of counters the job accumulates
+#   job_done:{id}   — set of license keys already processed
+#   job_lease:{id}  — token of the runner working on the job, renewed every chunk and
+#                     checked by every write, so slices never overlap
+#   jobs / jobs_active — sorted sets of all / unfinished job ids by creation time
+#   latest_job:{type}  — id of the most recent job of that type to finish
+# Each license is applied with one script that checks the done set, rewrites the
+# record only if it still holds what the chunk read (a concurrent revoke or
+# activation is never overwritten — the license is re-read and retried instead),
+# then marks it done and adds its counters. A slice that dies mid-chunk is simply
+# replayed by the next one, and nothing is applied twice.
+# /api/admin/stats serves the latest recompute_stats result and queues a new one
+# once license_revision has moved past it or it is older than STATS_MAX_AGE_SECONDS.
+
+JOB_CHUNK_SIZE = int(os.environ.get("JOB_CHUNK_SIZE", "100"))
+JOB_SLICE_SECONDS = float(os.environ.get("JOB_SLICE_SECONDS", "20"))
+JOB_LEASE_SECONDS = int(JOB_SLICE_SECONDS) + 30
+JOB_DONE_TTL = 7 * 86400
+JOB_LIST_LIMIT = 50
+JOB_WRITE_ATTEMPTS = 3
+STATS_MAX_AGE_SECONDS = float(os.environ.get("STATS_MAX_AGE_SECONDS", "300"))
+STATS_INLINE_SECONDS = float(os.environ.get("STATS_INLINE_SECONDS", "5"))
+
+
+# Handlers return (counters, replacement): replacement is the new stored value of
+# the license, or None to leave it alone. Extra commands queued on tx run in the
+# chunk's MULTI.
+
+def _job_recompute_stats(redis, job, key, lic, raw, tx):
+    return license_stat_counts(lic), None
+
+
+def _job_bulk_extend(redis, job, key, lic, raw, tx):
+    params = job["params"]
+    if params.get("tier") and lic.get("tier") != params["tier"]:
+        return {"skipped": 1}, None
+    if license_status(lic) != "active" and not params.get("include_inactive"):
+        return {"skipped": 1}, None
+    lic["expires_at"] = max(lic.get("expires_at", time.time()), time.time()) + int(params["days"]) * 86400
+    tx.incr("license_revision")
+    return {"extended": 1}, encode_license(lic)
+
+
+def _job_migrate_codec(redis, job, key, lic, raw, tx):
+    if isinstance(raw, str) and raw.startswith(_V2_PREFIX):
+        return {"already_current": 1}, None
+    return {"rewritten": 1}, encode_license(lic)
+
+
+def _job_reindex(redis, job, key, lic, raw, tx):
+    # Index writes are idempotent, so they need not join the chunk transaction
+    update_license_index(redis, key, lic)
+    backfill_machines_seen(redis, key, lic)
+    return {"indexed": 1}, None
+
+
+JOB_TYPES = {
+    "recompute_stats": _job_recompute_stats,
+    "bulk_extend": _job_bulk_extend,
+    "migrate_codec": _job_migrate_codec,
+    "reindex": _job_reindex,
+}
+
+
+def create_job(redis, job_type, params):
+    job_id = uuid.uuid4().hex[:12]
+    now = time.time()
+    redis.hset(f"job:{job_id}", values={
+        "type": job_type,
+        "status": "queued",
+        "params": json.dumps(params),
+        "cursor": 0,
+        "processed": 0,
+        "total": redis.scard("all_license_keys") or 0,
+        "revision": int(redis.get("license_revision") or 0),
+        "run_seconds": 0,
+        "created_at": now,
+        "updated_at": now,
+    })
+    pipe = redis.pipeline()
+    pipe.zadd("jobs", {job_id: now})
+    pipe.zadd("jobs_active", {job_id: now})
+    pipe.zremrangebyscore("jobs", "-inf", now - JOB_DONE_TTL)
+    pipe.exec()
+    return get_job(redis, job_id)
+
+
+def get_job(redis, job_id):
+    """Job hash + result counters, with progress and throughput derived"""
+    pipe = redis.pipeline()
+    pipe.hgetall(f"job:{job_id}")
+    pipe.hgetall(f"job_result:{job_id}")
+    raw, result = pipe.exec()
     if not raw:
         return None
-    if isinstance(raw, str):
-        return json.loads(raw)
-    return raw
+
+    job = {"id": job_id, "type": raw.get("type"), "status": raw.get("status"), "error": raw.get("error")}
+    job["params"] = json.loads(raw.get("params") or "{}")
+    for field in ("cursor", "processed", "total", "revision"):
+        job[field] = int(raw.get(field) or 0)
+    for field in ("run_seconds", "created_at", "updated_at", "started_at", "finished_at"):
+        job[field] = float(raw[field]) if raw.get(field) else None
+    job["progress"] = min(job["processed"] / job["total"], 1.0) if job["total"] else (1.0 if job["status"] == "done" else 0.0)
+    job["throughput"] = round(job["processed"] / job["run_seconds"], 1) if job["run_seconds"] else None
+    job["result"] = {k: int(v) for k, v in (result or {}).items()}
+    return job
+
+
+def list_jobs(redis, limit=JOB_LIST_LIMIT):
+    job_ids = redis.zrange("jobs", 0, limit - 1, rev=True) or []
+    return [job for job in (get_job(redis, job_id) for job_id in job_ids) if job]
+
+
+def ensure_job(redis, job_type, params=None):
+    """The unfinished job of this type (and params) if there is one, else a newly queued one"""
+    params = params or {}
+    job_ids = redis.zrange("jobs_active", 0, -1) or []
+    if job_ids:
+        pipe = redis.pipeline()
+        for job_id in job_ids:
+            pipe.hmget(f"job:{job_id}", "type", "params")
+        for job_id, (found_type, found_params) in zip(job_ids, pipe.exec()):
+            if found_type == job_type and json.loads(found_params or "{}") == params:
+                return get_job(redis, job_id)
+    return create_job(redis, job_type, params)
+
+
+def latest_job(redis, job_type):
+    """The most recent job of this type to finish, or None"""
+    job_id = redis.get(f"latest_job:{job_type}")
+    return get_job(redis, job_id) if job_id else None
+
+
+def _finish_job(redis, job_id, status, error=None, job_type=None):
+    values = {"status": status, "finished_at": time.time(), "updated_at": time.time()}
+    if error:
+        values["error"] = error
+    pipe = redis.pipeline()
+    pipe.hset(f"job:{job_id}", values=values)
+    pipe.zrem("jobs_active", job_id)
+    if status == "done" and job_type:
+        pipe.set(f"latest_job:{job_type}", job_id)
+    # Stats recounts are queued automatically, so finished jobs do not pile up forever
+    for key in (f"job:{job_id}", f"job_result:{job_id}", f"job_done:{job_id}"):
+        pipe.expire(key, JOB_DONE_TTL)
+    pipe.exec()
+
+
+# KEYS: license, done set, result hash, job hash, job lease
+# ARGV: record as read, replacement ("" for none), license key, lease token,
+#       then counter field/value pairs
+# Returns 1 applied, 0 already done, -1 the record changed since it was read,
+# -2 the lease now belongs to another runner
+_JOB_APPLY = """
+if redis.call('GET', KEYS[5]) ~= ARGV[4] then
+    return -2
+end
+if redis.call('SISMEMBER', KEYS[2], ARGV[3]) == 1 then
+    return 0
+end
+if ARGV[2] ~= '' then
+    if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+        return -1
+    end
+    redis.call('SET', KEYS[1], ARGV[2])
+end
+redis.call('SADD', KEYS[2], ARGV[3])
+for i = 5, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[3], ARGV[i], ARGV[i + 1])
+end
+redis.call('HINCRBY', KEYS[4], 'processed', 1)
+return 1
+"""
+
+# Renew (ARGV[2] = seconds) or release (no ARGV[2]) KEYS[1] only while it holds token ARGV[1]
+_JOB_LEASE = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if ARGV[2] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return redis.call('DEL', KEYS[1])
+"""
 
 
-def save_license(redis, key, data):
-    """Save license data to Redis"""
-    redis.set(f"license:{key}", json.dumps(data))
+class JobLeaseLost(Exception):
+    """The slice outlived its lease and another runner took the job over"""
+
+
+def _apply_job_chunk(redis, job, handler, keys, token):
+    """Run the handler over keys in one MULTI — returns the keys whose record changed underneath it"""
+    job_id = job["id"]
+    raws = redis.mget(*[f"license:{k}" for k in keys])
+    tx = redis.multi()
+    positions = []
+    for key, raw in zip(keys, raws):
+        lic = decode_license(raw, key)
+        # A license deleted since the SSCAN is just marked done
+        counters, replacement = handler(redis, job, key, lic, raw, tx) if lic else ({}, None)
+        positions.append((key, tx.queued()))
+        args = [raw or "", replacement or "", key, token]
+        for field, value in counters.items():
+            args.extend([field, value])
+        tx.eval(_JOB_APPLY, keys=[f"license:{key}", f"job_done:{job_id}", f"job_result:{job_id}", f"job:{job_id}",
+                                  f"job_lease:{job_id}"], args=args)
+    results = tx.exec()
+    if any(results[position] == -2 for _, position in positions):
+        raise JobLeaseLost(job_id)
+    return [key for key, position in positions if results[position] == -1]
+
+
+def run_job_slice(redis, job_id, deadline):
+    """Advance one job chunk by chunk until it finishes or the deadline passes.
+
+    Returns False if another runner holds the job's lease.
+    """
+    lease = f"job_lease:{job_id}"
+    token = uuid.uuid4().hex
+    if not redis.set(lease, token, nx=True, ex=JOB_LEASE_SECONDS):
+        return False
+
+    started = time.time()
+    try:
+        job = get_job(redis, job_id)
+        if not job or job["status"] not in ("queued", "running"):
+            redis.zrem("jobs_active", job_id)
+            return True
+        handler = JOB_TYPES.get(job["type"])
+        if handler is None:
+            _finish_job(redis, job_id, "failed", f"Unknown job type: {job['type']}")
+            return True
+        if job["status"] == "queued":
+            redis.hset(f"job:{job_id}", values={"status": "running", "started_at": started})
+
+        cursor = job["cursor"]
+        while time.time() < deadline:
+            if redis.hget(f"job:{job_id}", "status") == "cancelled":
+                redis.zrem("jobs_active", job_id)
+                break
+            # Every chunk starts with a full lease; a chunk that outlives it is refused
+            if not redis.eval(_JOB_LEASE, keys=[lease], args=[token, JOB_LEASE_SECONDS]):
+                raise JobLeaseLost(job_id)
+
+            next_cursor, keys = redis.sscan("all_license_keys", cursor, count=JOB_CHUNK_SIZE)
+            if keys:
+                pipe = redis.pipeline()
+                for key in keys:
+                    pipe.sismember(f"job_done:{job_id}", key)
+                keys = [k for k, done in zip(keys, pipe.exec()) if not done]
+
+            for _ in range(JOB_WRITE_ATTEMPTS):
+                if not keys:
+                    break
+                keys = _apply_job_chunk(redis, job, handler, keys, token)
+            if keys:
+                # Still being written to — leave them out rather than overwrite
+                redis.hincrby(f"job_result:{job_id}", "conflicts", len(keys))
+            redis.hset(f"job:{job_id}", values={"cursor": next_cursor, "updated_at": time.time()})
+
+            cursor = next_cursor
+            if cursor == 0:
+                _finish_job(redis, job_id, "done", job_type=job["type"])
+                break
+    except RedisUnavailable:
+        raise
+    except JobLeaseLost:
+        # The runner that holds the lease now carries on from the done set
+        pass
+    except Exception as e:
+        _finish_job(redis, job_id, "failed", str(e))
+    finally:
+        try:
+            redis.hincrbyfloat(f"job:{job_id}", "run_seconds", time.time() - started)
+            redis.eval(_JOB_LEASE, keys=[lease], args=[token])
+        except RedisUnavailable:
+            pass
+    return True
+
+
+def run_jobs(redis, budget_seconds=JOB_SLICE_SECONDS):
+    """Work through unfinished jobs, oldest first, within a time budget"""
+    deadline = time.time() + budget_seconds
+    ran = []
+    for job_id in redis.zrange("jobs_active", 0, -1) or []:
+        if time.time() >= deadline:
+            break
+        if run_job_slice(redis, job_id, deadline):
+            ran.append(job_id)
+    return ran
 
 
 # ==================== CORS PREFLIGHT ====================
@@ -377,11 +1657,16 @@ def handle_preflight():
     if request.method == "OPTIONS":
         resp = app.make_default_options_response()
         resp.headers["Access-Control-Allow-Origin"] = "*"
-        resp.headers["Access-Control-Allow-Headers"] = "Content-Type, X-Admin-Password"
+        resp.headers["Access-Control-Allow-Headers"] = "Content-Type, X-Admin-Password, X-Min-Revision"
         resp.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS, DELETE"
         return resp
 
 
+@app.errorhandler(RedisUnavailable)
+def handle_redis_unavailable(e):
+    return cors_response({"success": False, "degraded": True, "error": "Storage temporarily unavailable, please retry"}, 503)
+
+
 # ==================== APP ENDPOINTS ====================
 
 @app.route("/api/validate", methods=["POST", "OPTIONS"])
@@ -397,28 +1682,42 @@ def validate_license():
         return cors_response({"valid": False, "error": "Missing key or hwid"}, 400)
 
     redis = get_redis()
-    lic = get_license(redis, key)
+    try:
+        if not key_may_exist(redis, key):
+            return cors_response({"valid": False, "error": "Invalid license key"})
+
+        raw, reader = hedged_read(lambda r: r.get(f"license:{key}"), read_candidates())
+        lic = decode_license(raw, key)
+        error = validation_error(lic, hwid)
+        if error and reader is not redis:
+            # Replicas may lag the primary — only trust them for positive answers
+            raw = redis.get(f"license:{key}")
+            lic = decode_license(raw, key)
+            error = validation_error(lic, hwid)
+    except RedisUnavailable:
+        return degraded_validation(key, hwid)
+
     if not lic:
-        return cors_response({"valid": False, "error": "Invalid license key"})
+        remember_missing_key(key)
+    # Negative answers come from the primary, so they are as current as positive ones
+    remember_license_snapshot(key, lic)
+    if error:
+        return cors_response({"valid": False, "error": error})
 
-    if lic.get("revoked"):
-        return cors_response({"valid": False, "error": "License has been revoked"})
+    try:
+        record_heartbeat(redis, key, hwid, raw)
+    except RedisUnavailable:
+        pass
 
-    expires_at = lic.get("expires_at", 0)
-    if time.time() > expires_at:
-        return cors_response({"valid": False, "error": "License has expired"})
+    return cors_response(validation_success(lic))
 
-    machines = lic.get("machines", [])
-    if hwid not in [m["hwid"] for m in machines]:
-        return cors_response({"valid": False, "error": "Machine not activated"})
 
+def validation_success(lic):
+    """Body of a successful /api/validate response"""
     tier = lic.get("tier", "basic")
     tier_info = TIERS.get(tier, TIERS["basic"])
-
-    lic["last_validated"] = time.time()
-    save_license(redis, key, lic)
-
-    return cors_response({
+    expires_at = lic.get("expires_at", 0)
+    return {
         "valid": True,
         "tier": tier,
         "tier_name": tier_info["name"],
@@ -426,7 +1725,24 @@ def validate_license():
         "max_profiles": tier_info["max_profiles"],
         "expires_at": expires_at,
         "expires_at_human": datetime.fromtimestamp(expires_at).strftime("%Y-%m-%d %H:%M:%S")
-    })
+    }
+
+
+def degraded_validation(key, hwid):
+    """Answer validate from the last known-good snapshot while Redis is unreachable"""
+    lic, age = get_license_snapshot(key)
+    if lic is None:
+        _degraded["unavailable"] += 1
+        return cors_response({
+            "valid": False, "degraded": True,
+            "error": "License server temporarily unavailable, please retry"
+        }, 503)
+
+    _degraded["served"] += 1
+    error = validation_error(lic, hwid)
+    if error:
+        return cors_response({"valid": False, "error": error, "degraded": True, "snapshot_age": int(age)})
+    return cors_response(dict(validation_success(lic), degraded=True, snapshot_age=int(age)))
 
 
 @app.route("/api/activate", methods=["POST", "OPTIONS"])
@@ -443,8 +1759,11 @@ def activate_license():
         return cors_response({"success": False, "error": "Missing key or hwid"}, 400)
 
     redis = get_redis()
+    if not key_may_exist(redis, key):
+        return cors_response({"success": False, "error": "Invalid license key"})
     lic = get_license(redis, key)
     if not lic:
+        remember_missing_key(key)
         return cors_response({"success": False, "error": "Invalid license key"})
 
     if lic.get("revoked"):
@@ -454,6 +1773,7 @@ def activate_license():
     if time.time() > expires_at:
         return cors_response({"success": False, "error": "License has expired"})
 
+    previous = copy.deepcopy(lic)
     machines = lic.get("machines", [])
     tier = lic.get("tier", "basic")
     tier_info = TIERS.get(tier, TIERS["basic"])
@@ -472,11 +1792,15 @@ def activate_license():
                 "expires_at": expires_at
             })
 
+    reclaimed = None
     if len(machines) >= max_machines:
-        return cors_response({
-            "success": False,
-            "error": f"Machine limit reached ({max_machines} max). Deactivate a machine first or upgrade your plan."
-        })
+        reclaimed = stalest_inactive_machine(redis, key, lic) if len(machines) == max_machines else None
+        if not reclaimed:
+            return cors_response({
+                "success": False,
+                "error": f"Machine limit reached ({max_machines} max). Deactivate a machine first or upgrade your plan."
+            })
+        machines.remove(reclaimed)
 
     machines.append({
         "hwid": hwid,
@@ -485,9 +1809,14 @@ def activate_license():
     })
     lic["machines"] = machines
     lic["last_validated"] = time.time()
+    update_license_index(redis, key, lic, previous)
+    touch_machines(redis, key, [hwid])
     save_license(redis, key, lic)
+    if reclaimed:
+        forget_machines(redis, key, [reclaimed["hwid"]])
+    remember_license_snapshot(key, lic)
 
-    return cors_response({
+    resp = {
         "success": True,
         "message": "Machine activated successfully",
         "tier": tier,
@@ -495,7 +1824,10 @@ def activate_license():
         "features": tier_info["features"],
         "max_profiles": tier_info["max_profiles"],
         "expires_at": expires_at
-    })
+    }
+    if reclaimed:
+        resp["reclaimed_machine"] = {"hwid": reclaimed["hwid"], "machine_name": reclaimed.get("machine_name")}
+    return cors_response(resp)
 
 
 @app.route("/api/trial", methods=["POST", "OPTIONS"])
@@ -539,6 +1871,10 @@ def create_trial():
     save_license(redis, key, lic)
     redis.set(f"trial_hwid:{hwid}", key)
     redis.sadd("all_license_keys", key)
+    register_issued_key(redis, key)
+    update_license_index(redis, key, lic)
+    touch_machines(redis, key, [hwid])
+    remember_license_snapshot(key, lic)
 
     return cors_response({
         "success": True,
@@ -589,11 +1925,16 @@ def admin_generate():
     }
 
     redis = get_redis()
-    save_license(redis, key, lic)
+    save_license(redis, key, lic, bump=False)
     redis.sadd("all_license_keys", key)
+    register_issued_key(redis, key)
+    update_license_index(redis, key, lic)
+    # Only now, so a reader at this revision also sees the key list and indexes
+    revision = bump_revision(redis)
 
     return cors_response({
         "success": True,
+        "revision": revision,
         "key": key,
         "tier": tier,
         "tier_name": tier_info["name"],
@@ -609,83 +1950,99 @@ def admin_list_keys():
     if not verify_admin(request):
         return cors_response({"success": False, "error": "Unauthorized"}, 401)
 
-    redis = get_redis()
-    all_keys = redis.smembers("all_license_keys")
+    reader = get_read_redis(request_min_revision(request))
+    all_keys = reader.smembers("all_license_keys")
 
     if not all_keys:
         return cors_response({"success": True, "keys": []})
 
-    keys_data = []
-    for key in all_keys:
-        lic = get_license(redis, key)
-        if not lic:
-            continue
+    licenses = get_licenses(reader, all_keys)
+    last_validated = get_last_validated(reader, licenses)
+    keys_data = [license_summary(key, lic, last_validated.get(key)) for key, lic in licenses.items()]
 
-        tier = lic.get("tier", "basic")
-        tier_info = TIERS.get(tier, TIERS["basic"])
-        expires_at = lic.get("expires_at", 0)
-
-        status = "active"
-        if lic.get("revoked"):
-            status = "revoked"
-        elif time.time() > expires_at:
-            status = "expired"
-
-        keys_data.append({
-            "key": key,
-            "tier": tier,
-            "tier_name": tier_info["name"],
-            "status": status,
-            "created_at": lic.get("created_at", 0),
-            "created_at_human": datetime.fromtimestamp(lic.get("created_at", 0)).strftime("%Y-%m-%d %H:%M") if lic.get("created_at") else "N/A",
-            "expires_at": expires_at,
-            "expires_at_human": datetime.fromtimestamp(expires_at).strftime("%Y-%m-%d %H:%M") if expires_at else "N/A",
-            "machines": lic.get("machines", []),
-            "machine_count": len(lic.get("machines", [])),
-            "max_machines": lic.get("max_machines_override") or tier_info["max_machines"],
-            "last_validated": lic.get("last_validated"),
-            "notes": lic.get("notes", "")
-        })
+    keys_data.sort(key=lambda x: x["created_at"], reverse=True)
+    return cors_response({"success": True, "keys": keys_data})
+
+
+@app.route("/api/admin/search", methods=["GET", "OPTIONS"])
+def admin_search():
+    """Search licenses by key prefix, HWID, notes or machine name"""
+    if not verify_admin(request):
+        return cors_response({"success": False, "error": "Unauthorized"}, 401)
+
+    query = request.args.get("q", "").strip()
+    try:
+        limit = int(request.args.get("limit", 50))
+    except ValueError:
+        return cors_response({"success": False, "error": "Invalid limit"}, 400)
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    if not query:
+        return cors_response({"success": True, "keys": []})
+
+    reader = get_read_redis(request_min_revision(request))
+    matches = search_license_keys(reader, query, limit)
+    licenses = get_licenses(reader, matches)
+    last_validated = get_last_validated(reader, licenses)
 
+    keys_data = [license_summary(key, licenses[key], last_validated.get(key)) for key in matches if key in licenses]
     keys_data.sort(key=lambda x: x["created_at"], reverse=True)
     return cors_response({"success": True, "keys": keys_data})
 
 
+@app.route("/api/admin/reindex", methods=["POST", "OPTIONS"])
+def admin_reindex():
+    """Rebuild the search and machine last-seen indexes for every license
+    (backfill for licenses created before indexing) — queues a reindex job and
+    runs one slice of it; call /api/admin/jobs/run until it is done"""
+    if not verify_admin(request):
+        return cors_response({"success": False, "error": "Unauthorized"}, 401)
+
+    redis = get_redis()
+    job = ensure_job(redis, "reindex")
+    run_job_slice(redis, job["id"], time.time() + JOB_SLICE_SECONDS)
+    return cors_response({"success": True, "job": get_job(redis, job["id"])})
+
+
 @app.route("/api/admin/stats", methods=["GET", "OPTIONS"])
 def admin_stats():
-    """Dashboard statistics"""
+    """Dashboard statistics — from the latest recompute_stats job, recounted when stale"""
     if not verify_admin(request):
         return cors_response({"success": False, "error": "Unauthorized"}, 401)
 
     try:
         redis = get_redis()
-        all_keys = redis.smembers("all_license_keys")
+        revision = max(int(redis.get("license_revision") or 0), request_min_revision(request))
+        latest = latest_job(redis, "recompute_stats")
+        stale = (latest is None or latest["revision"] < revision
+                 or time.time() - latest["finished_at"] > STATS_MAX_AGE_SECONDS)
+        partial = False
+        if stale:
+            # Queue a recount (one at a time) and give it a bounded head start
+            job = ensure_job(redis, "recompute_stats")
+            run_job_slice(redis, job["id"], time.time() + STATS_INLINE_SECONDS)
+            job = get_job(redis, job["id"])
+            if job["status"] == "done":
+                latest, stale = job, False
+            elif latest is None:
+                latest, partial = job, True
 
         stats = {
             "total_keys": 0, "active": 0, "expired": 0, "revoked": 0,
             "trial": 0, "basic": 0, "pro": 0, "agency": 0,
             "total_machines": 0, "monthly_revenue": 0
         }
+        for field, value in latest["result"].items():
+            stats[field] = stats.get(field, 0) + value
 
-        if all_keys:
-            stats["total_keys"] = len(all_keys)
-            for key in all_keys:
-                lic = get_license(redis, key)
-                if not lic:
-                    continue
-                tier = lic.get("tier", "basic")
-                stats[tier] = stats.get(tier, 0) + 1
-                stats["total_machines"] += len(lic.get("machines", []))
-
-                if lic.get("revoked"):
-                    stats["revoked"] += 1
-                elif time.time() > lic.get("expires_at", 0):
-                    stats["expired"] += 1
-                else:
-                    stats["active"] += 1
-                    stats["monthly_revenue"] += TIERS.get(tier, {}).get("price", 0)
-
-        return cors_response({"success": True, "stats": stats})
+        return cors_response({
+            "success": True, "stats": stats,
+            "stats_job": {"id": latest["id"], "revision": latest["revision"], "finished_at": latest["finished_at"]},
+            "stale": stale, "partial": partial,
+            "key_filter": key_filter_stats(), "redis_endpoints": endpoint_stats(),
+            "degraded": degraded_stats()
+        })
+    except RedisUnavailable:
+        raise
     except Exception as e:
         return cors_response({"success": False, "error": f"Server error: {str(e)}"}, 500)
 
@@ -708,8 +2065,9 @@ def admin_revoke():
 
     lic["revoked"] = True
     lic["revoked_at"] = time.time()
-    save_license(redis, key, lic)
-    return cors_response({"success": True, "message": "License revoked"})
+    revision = save_license(redis, key, lic)
+    remember_license_snapshot(key, lic)
+    return cors_response({"success": True, "message": "License revoked", "revision": revision})
 
 
 @app.route("/api/admin/extend", methods=["POST", "OPTIONS"])
@@ -733,10 +2091,12 @@ def admin_extend():
     new_expiry = base_time + (days * 86400)
     lic["expires_at"] = new_expiry
     lic["revoked"] = False
-    save_license(redis, key, lic)
+    revision = save_license(redis, key, lic)
+    remember_license_snapshot(key, lic)
 
     return cors_response({
         "success": True,
+        "revision": revision,
         "message": f"License extended by {days} days",
         "new_expires_at": new_expiry,
         "new_expires_at_human": datetime.fromtimestamp(new_expiry).strftime("%Y-%m-%d %H:%M:%S")
@@ -755,31 +2115,134 @@ def admin_delete():
         return cors_response({"success": False, "error": "Missing key"}, 400)
 
     redis = get_redis()
+    lic = get_license(redis, key)
     redis.delete(f"license:{key}")
     redis.srem("all_license_keys", key)
-    return cors_response({"success": True, "message": "License deleted permanently"})
+    redis.hdel("license_last_validated", key)
+    remove_license_index(redis, key, lic or {})
+    remember_license_snapshot(key, None)
+    forget_machines(redis, key, [m["hwid"] for m in (lic or {}).get("machines", [])])
+    redis.delete(f"machines_seen:{key}")
+    revision = bump_revision(redis)
+    return cors_response({"success": True, "message": "License deleted permanently", "revision": revision})
 
 
 @app.route("/api/admin/deactivate", methods=["POST", "OPTIONS"])
 def admin_deactivate_machine():
-    """Remove a machine from a license"""
+    """Remove a machine from a license — or from every license it is on when no key is given"""
     if not verify_admin(request):
         return cors_response({"success": False, "error": "Unauthorized"}, 401)
 
     data = request.get_json(silent=True) or {}
     key = data.get("key", "").strip()
     hwid = data.get("hwid", "").strip()
-    if not key or not hwid:
-        return cors_response({"success": False, "error": "Missing key or hwid"}, 400)
+    if not hwid:
+        return cors_response({"success": False, "error": "Missing hwid"}, 400)
 
     redis = get_redis()
-    lic = get_license(redis, key)
-    if not lic:
+    keys = [key] if key else keys_for_hwid(redis, hwid)
+    licenses = get_licenses(redis, keys)
+    if not licenses:
         return cors_response({"success": False, "error": "Key not found"})
 
-    lic["machines"] = [m for m in lic.get("machines", []) if m["hwid"] != hwid]
-    save_license(redis, key, lic)
-    return cors_response({"success": True, "message": "Machine deactivated"})
+    for lic_key, lic in licenses.items():
+        previous = copy.deepcopy(lic)
+        lic["machines"] = [m for m in lic.get("machines", []) if m["hwid"] != hwid]
+        update_license_index(redis, lic_key, lic, previous)
+        forget_machines(redis, lic_key, [hwid])
+        revision = save_license(redis, lic_key, lic)
+        remember_license_snapshot(lic_key, lic)
+    return cors_response({
+        "success": True, "message": "Machine deactivated",
+        "keys": sorted(licenses), "revision": revision
+    })
+
+
+@app.route("/api/admin/sweep-machines", methods=["POST", "OPTIONS"])
+def admin_sweep_machines():
+    """Remove machines inactive for SEAT_INACTIVITY_DAYS, one bounded batch per call"""
+    if not verify_admin(request):
+        return cors_response({"success": False, "error": "Unauthorized"}, 401)
+    if SEAT_INACTIVITY_DAYS <= 0:
+        return cors_response({"success": False, "error": "Seat reclamation is disabled (SEAT_INACTIVITY_DAYS=0)"}, 400)
+
+    data = request.get_json(silent=True) or {}
+    try:
+        batch_size = int(data.get("batch_size", 100))
+    except (TypeError, ValueError):
+        return cors_response({"success": False, "error": "Invalid batch_size"}, 400)
+    batch_size = max(1, min(batch_size, SWEEP_MAX_BATCH))
+
+    redis = get_redis()
+    pruned, more = sweep_inactive_machines(redis, batch_size)
+    return cors_response({"success": True, "pruned": pruned, "more": more})
+
+
+@app.route("/api/admin/jobs", methods=["GET", "POST", "OPTIONS"])
+def admin_jobs():
+    """GET — list recent jobs with progress. POST — queue a job: {type, params}"""
+    if not verify_admin(request):
+        return cors_response({"success": False, "error": "Unauthorized"}, 401)
+
+    redis = get_redis()
+    if request.method == "GET":
+        return cors_response({"success": True, "jobs": list_jobs(redis), "types": sorted(JOB_TYPES)})
+
+    data = request.get_json(silent=True) or {}
+    job_type = data.get("type", "")
+    params = data.get("params") or {}
+    if job_type not in JOB_TYPES:
+        return cors_response({"success": False, "error": f"Invalid job type: {job_type}"}, 400)
+    if job_type == "bulk_extend":
+        try:
+            params["days"] = int(params.get("days", 0))
+        except (TypeError, ValueError):
+            params["days"] = 0
+        if params["days"] <= 0:
+            return cors_response({"success": False, "error": "bulk_extend needs params.days > 0"}, 400)
+
+    return cors_response({"success": True, "job": create_job(redis, job_type, params)})
+
+
+@app.route("/api/admin/jobs/run", methods=["POST", "OPTIONS"])
+def admin_run_jobs():
+    """Advance unfinished jobs for up to budget_seconds — call repeatedly until none are left"""
+    if not verify_admin(request):
+        return cors_response({"success": False, "error": "Unauthorized"}, 401)
+
+    data = request.get_json(silent=True) or {}
+    try:
+        budget = float(data.get("budget_seconds", JOB_SLICE_SECONDS))
+    except (TypeError, ValueError):
+        budget = float("nan")
+    if not budget > 0:
+        return cors_response({"success": False, "error": "budget_seconds must be a positive number"}, 400)
+    budget = min(budget, JOB_SLICE_SECONDS)
+
+    redis = get_redis()
+    ran = run_jobs(redis, budget)
+    return cors_response({
+        "success": True,
+        "jobs": [get_job(redis, job_id) for job_id in ran],
+        "pending": redis.zcard("jobs_active") or 0
+    })
+
+
+@app.route("/api/admin/jobs/cancel", methods=["POST", "OPTIONS"])
+def admin_cancel_job():
+    """Cancel a queued or running job — work already committed stays"""
+    if not verify_admin(request):
+        return cors_response({"success": False, "error": "Unauthorized"}, 401)
+
+    data = request.get_json(silent=True) or {}
+    job_id = data.get("id", "").strip()
+    redis = get_redis()
+    job = get_job(redis, job_id) if job_id else None
+    if not job:
+        return cors_response({"success": False, "error": "Job not found"})
+    if job["status"] in ("queued", "running"):
+        _finish_job(redis, job_id, "cancelled")
+    return cors_response({"success": True, "job": get_job(redis, job_id)})
 
 
 @app.route("/api/health", methods=["GET", "OPTIONS"])
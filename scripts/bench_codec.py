@@ -0,0 +1,81 @@
+"""
+Benchmark stored license formats — bytes per license and encode/decode time.
+
+    python scripts/bench_codec.py
+
+Compares the legacy v1 format (plain json.dumps) against the current v2 codec
+for a trial, a pro license with 3 machines and an agency license with 10.
+"""
+
+import os
+import sys
+import json
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from index import encode_license, decode_license, generate_key  # noqa: E402
+
+ROUNDS = 20000
+
+
+def make_license(tier, machine_count, notes):
+    now = time.time()
+    return {
+        "key": generate_key(),
+        "tier": tier,
+        "created_at": now,
+        "expires_at": now + 30 * 86400,
+        "revoked": False,
+        "machines": [{
+            "hwid": f"{i:02d}" + "a3f9c2e1b7d4" * 5,
+            "machine_name": f"DESKTOP-{i:04d}",
+            "activated_at": now - i * 3600
+        } for i in range(machine_count)],
+        "max_machines_override": None,
+        "last_validated": now,
+        "notes": notes
+    }
+
+
+def bench(lic):
+    key = lic["key"]
+    v1 = json.dumps(lic)
+    v2 = encode_license(lic)
+    decoded = decode_license(v2, key)
+    assert decode_license(v1, key) == lic
+    assert [m["hwid"] for m in decoded["machines"]] == [m["hwid"] for m in lic["machines"]]
+    assert decoded["expires_at"] == int(round(lic["expires_at"]))
+
+    def per_call_us(fn):
+        return min(timeit.repeat(fn, number=ROUNDS, repeat=3)) / ROUNDS * 1e6
+
+    return {
+        "v1_bytes": len(v1.encode()),
+        "v2_bytes": len(v2.encode()),
+        "v1_encode_us": per_call_us(lambda: json.dumps(lic)),
+        "v2_encode_us": per_call_us(lambda: encode_license(lic)),
+        "v1_decode_us": per_call_us(lambda: decode_license(v1, key)),
+        "v2_decode_us": per_call_us(lambda: decode_license(v2, key)),
+    }
+
+
+def main():
+    samples = [
+        ("trial", make_license("trial", 1, "Auto-generated trial")),
+        ("pro x3", make_license("pro", 3, "Reseller — John")),
+        ("agency x10", make_license("agency", 10, "")),
+    ]
+    print(f"{'license':<12}{'v1 B':>8}{'v2 B':>8}{'saved':>8}"
+          f"{'v1 enc us':>11}{'v2 enc us':>11}{'v1 dec us':>11}{'v2 dec us':>11}")
+    for name, lic in samples:
+        r = bench(lic)
+        saved = 1 - r["v2_bytes"] / r["v1_bytes"]
+        print(f"{name:<12}{r['v1_bytes']:>8}{r['v2_bytes']:>8}{saved:>8.0%}"
+              f"{r['v1_encode_us']:>11.2f}{r['v2_encode_us']:>11.2f}"
+              f"{r['v1_decode_us']:>11.2f}{r['v2_decode_us']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
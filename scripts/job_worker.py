@@ -0,0 +1,47 @@
+"""
+Local worker for background jobs — runs queued jobs without Vercel's time limit.
+
+    UPSTASH_REDIS_REST_URL=... UPSTASH_REDIS_REST_TOKEN=... python scripts/job_worker.py
+
+Works in the same bounded slices as POST /api/admin/jobs/run, so it can run
+alongside the deployed server; the per-job lease keeps them from overlapping.
+Pass --once to drain the queue and exit instead of polling forever.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from index import get_redis, get_job, run_jobs, RedisUnavailable, JOB_SLICE_SECONDS  # noqa: E402
+
+IDLE_SLEEP_SECONDS = 5
+
+
+def main():
+    once = "--once" in sys.argv
+    redis = get_redis()
+    while True:
+        try:
+            ran = run_jobs(redis, JOB_SLICE_SECONDS)
+        except RedisUnavailable as e:
+            print(f"Redis unavailable: {e}", flush=True)
+            ran = []
+            time.sleep(IDLE_SLEEP_SECONDS)
+
+        for job_id in ran:
+            job = get_job(redis, job_id)
+            if job:
+                print(f"{job['id']} {job['type']:<16} {job['status']:<9} "
+                      f"{job['processed']}/{job['total']} ({job['progress']:.0%}) "
+                      f"{job['throughput'] or 0} keys/s", flush=True)
+
+        if not ran:
+            if once:
+                break
+            time.sleep(IDLE_SLEEP_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
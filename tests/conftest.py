@@ -0,0 +1,105 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+os.environ.setdefault("ADMIN_PASSWORD", "test-admin")
+
+import index  # noqa: E402
+from fake_upstash import FakeStore, FakeUpstashSession  # noqa: E402
+
+
+def _rewrite_if_unchanged(store, keys, args):
+    if store.data.get(keys[0]) == args[0]:
+        store.data[keys[0]] = args[1]
+        return 1
+    return 0
+
+
+FakeStore.scripts[index._REWRITE_IF_UNCHANGED] = _rewrite_if_unchanged
+
+
+def _drop_index_term(store, keys, args):
+    store.cmd_srem(keys[0], args[1])
+    if store.cmd_scard(keys[0]) == 0:
+        store.cmd_zrem(keys[1], args[0])
+    return 1
+
+
+FakeStore.scripts[index._DROP_INDEX_TERM] = _drop_index_term
+
+
+def _job_apply(store, keys, args):
+    license_key, done, result, job, lease = keys
+    expected, replacement, member, token = args[:4]
+    if store.data.get(lease) != token:
+        return -2
+    if store.cmd_sismember(done, member):
+        return 0
+    if replacement != "":
+        if store.data.get(license_key) != expected:
+            return -1
+        store.cmd_set(license_key, replacement)
+    store.cmd_sadd(done, member)
+    for field, value in zip(args[4::2], args[5::2]):
+        store.cmd_hincrby(result, field, value)
+    store.cmd_hincrby(job, "processed", 1)
+    return 1
+
+
+FakeStore.scripts[index._JOB_APPLY] = _job_apply
+
+
+def _job_lease(store, keys, args):
+    if store.data.get(keys[0]) != args[0]:
+        return 0
+    if len(args) > 1:
+        return store.cmd_expire(keys[0], args[1])
+    return store.cmd_del(keys[0])
+
+
+FakeStore.scripts[index._JOB_LEASE] = _job_lease
+
+
+def make_endpoint(name, store, delay=0.0):
+    """A real TrackedRedis whose HTTP session is served by a FakeStore"""
+    endpoint = index.TrackedRedis(name, f"https://{name}.fake.upstash.io", "token")
+    endpoint._session = FakeUpstashSession(store, delay)
+    return endpoint
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """Fresh in-process caches for every test"""
+    index._endpoints.update(primary=None, replicas=[])
+    index._primary_revisions.clear()
+    index._key_filter.update(bloom=None, version=None, synced_at=0, rejected_format=0,
+                             rejected_bloom=0, rejected_negative=0, passed=0,
+                             failed_open=0)
+    index._negative_cache.clear()
+    index._license_snapshots.clear()
+    index._heartbeats.clear()
+    index._degraded.update(served=0, unavailable=0)
+
+
+@pytest.fixture
+def endpoint_factory():
+    return make_endpoint
+
+
+@pytest.fixture
+def primary():
+    endpoint = make_endpoint("primary", FakeStore())
+    index._endpoints["primary"] = endpoint
+    return endpoint
+
+
+@pytest.fixture
+def client(primary):
+    return index.app.test_client()
+
+
+@pytest.fixture
+def admin():
+    return {"X-Admin-Password": os.environ["ADMIN_PASSWORD"]}
@@ -0,0 +1,329 @@
+"""
+In-process stand-in for the Upstash REST API.
+
+FakeUpstashSession replaces the requests Session inside a TrackedRedis, so the
+real upstash_redis command building, base64 response decoding and pipelines
+are exercised against an in-memory FakeStore. Several sessions can point at
+separate stores to play primary and read replicas.
+"""
+
+import base64
+import threading
+import time
+
+import requests
+
+
+class FakeStore:
+    """Just enough Redis semantics for the license server"""
+
+    # Lua scripts the server sends with EVAL, keyed by source: fn(store, keys, args)
+    scripts = {}
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.RLock()
+
+    def copy_from(self, other):
+        """Replicate another store's contents (a replica catching up)"""
+        import copy
+        with other.lock:
+            snapshot = copy.deepcopy(other.data)
+        with self.lock:
+            self.data = snapshot
+
+    # ---- helpers ----
+    def _get(self, key, kind):
+        value = self.data.get(key)
+        if value is None:
+            return kind()
+        if not isinstance(value, kind):
+            raise ValueError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _set(self, key, value):
+        if value:
+            self.data[key] = value
+        else:
+            self.data.pop(key, None)
+
+    # ---- dispatch ----
+    def execute(self, command):
+        name, args = str(command[0]).upper(), list(command[1:])
+        with self.lock:
+            return getattr(self, f"cmd_{name.lower()}")(*args)
+
+    # strings
+    def cmd_ping(self):
+        return "PONG"
+
+    def cmd_get(self, key):
+        value = self.data.get(key)
+        if value is not None and not isinstance(value, str):
+            raise ValueError("WRONGTYPE")
+        return value
+
+    def cmd_set(self, key, value, *opts):
+        opts = [str(o).upper() if isinstance(o, str) else o for o in opts]
+        if "NX" in opts and key in self.data:
+            return None
+        self.data[key] = str(value)
+        return "OK"
+
+    def cmd_mget(self, *keys):
+        return [self.data.get(k) if isinstance(self.data.get(k), str) else None for k in keys]
+
+    def cmd_del(self, *keys):
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    def cmd_expire(self, key, seconds):
+        return int(key in self.data)
+
+    def cmd_incr(self, key):
+        value = int(self.data.get(key, 0)) + 1
+        self.data[key] = str(value)
+        return value
+
+    # sets
+    def cmd_sadd(self, key, *members):
+        s = self._get(key, set)
+        before = len(s)
+        s.update(str(m) for m in members)
+        self._set(key, s)
+        return len(s) - before
+
+    def cmd_srem(self, key, *members):
+        s = self._get(key, set)
+        before = len(s)
+        s.difference_update(str(m) for m in members)
+        self._set(key, s)
+        return before - len(s)
+
+    def cmd_smembers(self, key):
+        return sorted(self._get(key, set))
+
+    def cmd_sismember(self, key, member):
+        return int(str(member) in self._get(key, set))
+
+    def cmd_smismember(self, key, *members):
+        s = self._get(key, set)
+        return [int(str(m) in s) for m in members]
+
+    def cmd_scard(self, key):
+        return len(self._get(key, set))
+
+    def cmd_sinter(self, *keys):
+        sets = [self._get(k, set) for k in keys]
+        return sorted(set.intersection(*sets)) if sets else []
+
+    def cmd_sunion(self, *keys):
+        return sorted(set().union(*[self._get(k, set) for k in keys]))
+
+    def cmd_sscan(self, key, cursor, *opts):
+        count = 10
+        if "COUNT" in opts:
+            count = int(opts[opts.index("COUNT") + 1])
+        members = sorted(self._get(key, set))
+        cursor = int(cursor)
+        chunk = members[cursor:cursor + count]
+        next_cursor = cursor + count
+        return [str(0 if next_cursor >= len(members) else next_cursor), chunk]
+
+    # sorted sets
+    def cmd_zadd(self, key, *args):
+        args = list(args)
+        flags = set()
+        while args and isinstance(args[0], str) and args[0].upper() in ("NX", "XX", "GT", "LT", "CH", "INCR"):
+            flags.add(args.pop(0).upper())
+        z = self._get(key, dict)
+        added = 0
+        for score, member in zip(args[::2], args[1::2]):
+            member = str(member)
+            if member in z and "NX" in flags:
+                continue
+            added += member not in z
+            z[member] = float(score)
+        self._set(key, z)
+        return added
+
+    def cmd_zrem(self, key, *members):
+        z = self._get(key, dict)
+        removed = sum(z.pop(str(m), None) is not None for m in members)
+        self._set(key, z)
+        return removed
+
+    def cmd_zremrangebyscore(self, key, low, high):
+        z = self._get(key, dict)
+        low = float("-inf") if low == "-inf" else float(low)
+        high = float("inf") if high in ("+inf", "inf") else float(high)
+        removed = [m for m, score in z.items() if low <= score <= high]
+        for member in removed:
+            del z[member]
+        self._set(key, z)
+        return len(removed)
+
+    def cmd_zcard(self, key):
+        return len(self._get(key, dict))
+
+    def cmd_zscore(self, key, member):
+        score = self._get(key, dict).get(str(member))
+        return None if score is None else repr(score)
+
+    def cmd_zrange(self, key, start, stop, *opts):
+        opts = [o.upper() if isinstance(o, str) else o for o in opts]
+        z = self._get(key, dict)
+        rev = "REV" in opts
+        if "BYLEX" in opts:
+            def in_range(m):
+                if start != "-" and not (m >= start[1:] if start[0] == "[" else m > start[1:]):
+                    return False
+                if stop != "+" and not (m <= stop[1:] if stop[0] == "[" else m < stop[1:]):
+                    return False
+                return True
+            items = sorted(m for m in z if in_range(m))
+        elif "BYSCORE" in opts:
+            def bound(v):
+                v = str(v)
+                if v in ("-inf", "+inf", "inf"):
+                    return float(v if v != "inf" else "+inf")
+                return float(v.lstrip("("))
+            lo, hi = bound(start), bound(stop)
+            if rev:
+                lo, hi = hi, lo
+            items = [m for m, s in sorted(z.items(), key=lambda x: (x[1], x[0])) if lo <= s <= hi]
+        else:
+            items = [m for m, _ in sorted(z.items(), key=lambda x: (x[1], x[0]))]
+            if rev:
+                items.reverse()
+            start, stop = int(start), int(stop)
+            stop = len(items) + stop if stop < 0 else stop
+            items = items[start:stop + 1]
+        if rev and ("BYSCORE" in opts or "BYLEX" in opts):
+            items.reverse()
+        if "LIMIT" in opts:
+            i = opts.index("LIMIT")
+            offset, count = int(opts[i + 1]), int(opts[i + 2])
+            items = items[offset:offset + count]
+        return items
+
+    # hashes
+    def cmd_hset(self, key, *pairs):
+        h = self._get(key, dict)
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in h
+            h[str(field)] = str(value)
+        self._set(key, h)
+        return added
+
+    def cmd_hsetnx(self, key, field, value):
+        h = self._get(key, dict)
+        if field in h:
+            return 0
+        h[str(field)] = str(value)
+        self._set(key, h)
+        return 1
+
+    def cmd_hget(self, key, field):
+        return self._get(key, dict).get(field)
+
+    def cmd_hmget(self, key, *fields):
+        h = self._get(key, dict)
+        return [h.get(f) for f in fields]
+
+    def cmd_hgetall(self, key):
+        flat = []
+        for field, value in self._get(key, dict).items():
+            flat.extend([field, value])
+        return flat
+
+    def cmd_hdel(self, key, *fields):
+        h = self._get(key, dict)
+        removed = sum(h.pop(f, None) is not None for f in fields)
+        self._set(key, h)
+        return removed
+
+    def cmd_hincrby(self, key, field, amount):
+        h = self._get(key, dict)
+        h[field] = str(int(h.get(field, 0)) + int(amount))
+        self._set(key, h)
+        return int(h[field])
+
+    def cmd_hincrbyfloat(self, key, field, amount):
+        h = self._get(key, dict)
+        h[field] = repr(float(h.get(field, 0)) + float(amount))
+        self._set(key, h)
+        return h[field]
+
+    # lists
+    def cmd_lpush(self, key, *values):
+        lst = self._get(key, list)
+        for v in values:
+            lst.insert(0, str(v))
+        self._set(key, lst)
+        return len(lst)
+
+    def cmd_ltrim(self, key, start, stop):
+        lst = self._get(key, list)
+        stop = len(lst) + stop if stop < 0 else stop
+        self._set(key, lst[start:stop + 1])
+        return "OK"
+
+    def cmd_lrange(self, key, start, stop):
+        lst = self._get(key, list)
+        stop = len(lst) + stop if stop < 0 else stop
+        return lst[start:stop + 1]
+
+    # scripting
+    def cmd_eval(self, script, numkeys, *rest):
+        numkeys = int(numkeys)
+        return self.scripts[script](self, list(rest[:numkeys]), list(rest[numkeys:]))
+
+
+def _encode(result):
+    """Encode a result the way Upstash does with Upstash-Encoding: base64"""
+    if isinstance(result, str):
+        return "OK" if result == "OK" else base64.b64encode(result.encode()).decode()
+    if isinstance(result, list):
+        return [_encode(r) for r in result]
+    return result
+
+
+class _Response:
+    def __init__(self, body):
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class FakeUpstashSession:
+    """requests.Session replacement that answers REST calls from a FakeStore"""
+
+    def __init__(self, store, delay=0.0):
+        self.store = store
+        self.delay = delay
+        self.down = False
+        self.calls = []
+
+    def _run(self, command):
+        try:
+            return {"result": _encode(self.store.execute(command))}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def post(self, url, headers=None, json=None, **kwargs):
+        self.calls.append(json)
+        if self.delay:
+            time.sleep(self.delay)
+        if self.down:
+            raise requests.exceptions.ConnectionError("fake endpoint is down")
+        if url.endswith("/pipeline"):
+            return _Response([self._run(c) for c in json])
+        if url.endswith("/multi-exec"):
+            with self.store.lock:
+                return _Response([self._run(c) for c in json])
+        return _Response(self._run(json))
+
+    def close(self):
+        pass
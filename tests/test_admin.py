@@ -0,0 +1,29 @@
+import index
+
+
+def commands(session):
+    """Flatten the session call log into single commands"""
+    flat = []
+    for body in session.calls:
+        flat.extend(body if body and isinstance(body[0], list) else [body])
+    return flat
+
+
+def test_generate_bumps_revision_after_every_related_write(client, primary, admin):
+    response = client.post("/api/admin/generate", json={"tier": "pro", "days": 30}, headers=admin)
+    body = response.get_json()
+    assert body["success"]
+
+    names = [(c[0].upper(), c[1] if len(c) > 1 else None) for c in commands(primary._session)]
+    bump = names.index(("INCR", "license_revision"))
+    assert bump == max(i for i, c in enumerate(names) if c[0] not in ("GET", "MGET", "SMEMBERS"))
+    assert body["revision"] == int(primary.get("license_revision"))
+    assert primary.sismember("all_license_keys", body["key"])
+
+
+def test_stats_reports_redis_outage_as_503(client, primary, admin):
+    primary._session.down = True
+
+    response = client.get("/api/admin/stats", headers=admin)
+
+    assert response.status_code == 503
@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+
+import index
+
+
+def trip(endpoint):
+    endpoint.consecutive_failures = index.CIRCUIT_FAILURE_THRESHOLD
+    endpoint.circuit_opened_at = time.time() - index.CIRCUIT_RESET_SECONDS - 1
+
+
+def test_open_circuit_fails_fast(primary):
+    trip(primary)
+    primary.circuit_opened_at = time.time()
+
+    with pytest.raises(index.RedisUnavailable):
+        primary.get("k")
+    assert primary._session.calls == []
+
+
+def test_half_open_lets_a_single_trial_through(primary):
+    trip(primary)
+    primary._session.delay = 0.1
+    results = []
+
+    def read():
+        try:
+            results.append(primary.get("k") or "ok")
+        except index.RedisUnavailable:
+            results.append("rejected")
+
+    threads = [threading.Thread(target=read) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(results) == ["ok"] + ["rejected"] * 4
+    assert len(primary._session.calls) == 1
+    assert primary.circuit_state() == "closed"
+
+
+def test_failed_trial_reopens_the_circuit(primary):
+    trip(primary)
+    primary._session.down = True
+
+    with pytest.raises(index.RedisUnavailable):
+        primary.get("k")
+
+    assert primary.circuit_state() == "open"
+    assert primary.trial_in_flight is False
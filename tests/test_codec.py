@@ -0,0 +1,75 @@
+import json
+
+import index
+
+KEY = "IGTOOL-1234-5678-9ABC-DEF0"
+
+
+def full_license():
+    return {
+        "key": KEY, "tier": "agency", "created_at": 1700000000.4, "expires_at": 1702592000.6,
+        "revoked": True, "revoked_at": 1701000000.8,
+        "machines": [{"hwid": "HW1", "machine_name": "Büro-PC", "activated_at": 1700000100.7}],
+        "max_machines_override": 7, "last_validated": 1700500000.2, "notes": "Acme | reseller",
+    }
+
+
+def test_round_trip_rounds_timestamps_to_int():
+    lic = index.decode_license(index.encode_license(full_license()), KEY)
+
+    assert lic["created_at"] == 1700000000 and lic["expires_at"] == 1702592001
+    assert lic["revoked_at"] == 1701000001
+    assert lic["machines"] == [{"hwid": "HW1", "machine_name": "Büro-PC", "activated_at": 1700000101}]
+    assert isinstance(lic["machines"][0]["activated_at"], int) and isinstance(lic["revoked_at"], int)
+    untouched = index._TIMESTAMP_FIELDS | {"machines"}
+    assert {k: v for k, v in lic.items() if k not in untouched} == \
+        {k: v for k, v in full_license().items() if k not in untouched}
+
+
+def test_defaults_are_omitted_and_restored():
+    lic = {"key": KEY, "tier": "basic", "created_at": 1, "expires_at": 2, "revoked": False, "machines": [],
+           "max_machines_override": None, "last_validated": None, "notes": ""}
+
+    raw = index.encode_license(lic)
+
+    assert raw == '2|{"t":"basic","c":1,"e":2}'
+    assert index.decode_license(raw, KEY) == lic
+
+
+def test_key_is_implied_by_the_redis_key():
+    raw = index.encode_license(full_license())
+
+    assert KEY not in raw
+    assert "key" not in index.decode_license(raw)
+    assert index.decode_license(raw, KEY)["key"] == KEY
+
+
+def test_reads_v1_records():
+    v1 = {k: v for k, v in full_license().items() if k != "key"}
+    raw = json.dumps(v1)
+
+    assert index.decode_license(raw) == v1
+    assert index.decode_license(raw, KEY) == dict(v1, key=KEY)
+    assert index.decode_license(json.dumps(full_license()), "ignored")["key"] == KEY
+    assert index.decode_license(None) is None and index.decode_license("") is None
+
+
+def test_v2_is_smaller_than_v1():
+    lic = full_license()
+    assert len(index.encode_license(lic)) < len(json.dumps(lic))
+
+
+def test_migrate_codec_rewrites_only_v1_records(client, primary, admin):
+    v2_key = client.post("/api/admin/generate", json={"tier": "pro", "days": 30}, headers=admin).get_json()["key"]
+    v2_raw = primary.get(f"license:{v2_key}")
+    primary.set(f"license:{KEY}", json.dumps(full_license()))
+    primary.sadd("all_license_keys", KEY)
+
+    job = index.create_job(primary, "migrate_codec", {})
+    index.run_job_slice(primary, job["id"], index.time.time() + 5)
+
+    assert index.get_job(primary, job["id"])["result"] == {"rewritten": 1, "already_current": 1}
+    assert primary.get(f"license:{v2_key}") == v2_raw
+    migrated = primary.get(f"license:{KEY}")
+    assert migrated.startswith(index._V2_PREFIX)
+    assert index.decode_license(migrated, KEY)["notes"] == "Acme | reseller"
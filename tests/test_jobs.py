@@ -0,0 +1,203 @@
+import index
+
+
+def generate(client, admin, n, tier="pro"):
+    return [client.post("/api/admin/generate", json={"tier": tier, "days": 30}, headers=admin).get_json()
+            for _ in range(n)]
+
+
+def test_stats_are_served_from_the_latest_recount(client, primary, admin):
+    generate(client, admin, 3)
+
+    body = client.get("/api/admin/stats", headers=admin).get_json()
+    assert body["stats"]["total_keys"] == 3 and body["stats"]["active"] == 3
+    assert body["stale"] is False and body["partial"] is False
+
+    jobs = primary.zcard("jobs")
+    again = client.get("/api/admin/stats", headers=admin).get_json()
+    assert again["stats_job"]["id"] == body["stats_job"]["id"]
+    assert primary.zcard("jobs") == jobs
+
+
+def test_stats_recount_after_a_license_changes(client, primary, admin):
+    generate(client, admin, 2)
+    first = client.get("/api/admin/stats", headers=admin).get_json()
+
+    generate(client, admin, 1, tier="agency")
+    body = client.get("/api/admin/stats", headers=admin).get_json()
+
+    assert body["stats_job"]["id"] != first["stats_job"]["id"]
+    assert body["stats"]["total_keys"] == 3 and body["stats"]["agency"] == 1
+
+
+def test_unfinished_stats_recount_is_not_queued_twice(client, primary, admin, monkeypatch):
+    generate(client, admin, 5)
+    monkeypatch.setattr(index, "STATS_INLINE_SECONDS", 0)
+
+    first = client.get("/api/admin/stats", headers=admin).get_json()
+    second = client.get("/api/admin/stats", headers=admin).get_json()
+
+    assert first["partial"] is True
+    assert second["stats_job"]["id"] == first["stats_job"]["id"]
+    assert primary.zcard("jobs_active") == 1
+
+
+def test_reindex_queues_a_reindex_job(client, primary, admin):
+    keys = [g["key"] for g in generate(client, admin, 2)]
+    primary.delete("idx:keys")
+
+    body = client.post("/api/admin/reindex", headers=admin).get_json()
+
+    assert body["job"]["type"] == "reindex" and body["job"]["status"] == "done"
+    assert body["job"]["result"] == {"indexed": 2}
+    assert sorted(primary.zrange("idx:keys", 0, -1)) == sorted(keys)
+
+
+class Killed(BaseException):
+    """Stands in for the process dying mid-chunk (not caught like a job error)"""
+
+
+def expiries(primary, keys):
+    return {key: index.get_license(primary, key)["expires_at"] for key in keys}
+
+
+def test_killed_slice_resumes_without_processing_a_license_twice(client, primary, admin, monkeypatch):
+    keys = [g["key"] for g in generate(client, admin, 5)]
+    before = expiries(primary, keys)
+    monkeypatch.setattr(index, "JOB_CHUNK_SIZE", 2)
+
+    calls = []
+    handler = index.JOB_TYPES["bulk_extend"]
+
+    def dies_in_second_chunk(redis, job, key, lic, raw, tx):
+        calls.append(key)
+        if len(calls) == 4:
+            raise Killed()
+        return handler(redis, job, key, lic, raw, tx)
+
+    monkeypatch.setitem(index.JOB_TYPES, "bulk_extend", dies_in_second_chunk)
+    job = index.create_job(primary, "bulk_extend", {"days": 10})
+    try:
+        index.run_job_slice(primary, job["id"], index.time.time() + 5)
+    except Killed:
+        pass
+
+    # The first chunk committed; the second chunk's queued writes never ran
+    interrupted = index.get_job(primary, job["id"])
+    assert interrupted["status"] == "running" and interrupted["processed"] == 2
+    assert sum(expiries(primary, keys)[k] != before[k] for k in keys) == 2
+
+    calls.clear()
+    index.run_job_slice(primary, job["id"], index.time.time() + 5)
+
+    done = index.get_job(primary, job["id"])
+    assert done["status"] == "done" and done["processed"] == 5
+    assert done["result"] == {"extended": 5}
+    assert len(calls) == 3
+    after = expiries(primary, keys)
+    assert all(round(after[k] - before[k]) == 10 * 86400 for k in keys)
+
+
+def test_done_set_skips_licenses_already_processed(client, primary, admin, monkeypatch):
+    keys = [g["key"] for g in generate(client, admin, 3)]
+    monkeypatch.setattr(index, "JOB_CHUNK_SIZE", 2)
+    job = index.create_job(primary, "bulk_extend", {"days": 10})
+    index.run_job_slice(primary, job["id"], index.time.time() + 5)
+    extended = expiries(primary, keys)
+
+    # Replay the whole keyspace, as a runner that lost its cursor would
+    primary.hset(f"job:{job['id']}", values={"status": "running", "cursor": 0})
+    primary.zadd("jobs_active", {job["id"]: 1})
+    index.run_job_slice(primary, job["id"], index.time.time() + 5)
+
+    assert expiries(primary, keys) == extended
+    assert index.get_job(primary, job["id"])["processed"] == 3
+
+
+def test_run_jobs_rejects_a_bad_budget(client, admin):
+    for budget in ("soon", None, -1, 0):
+        response = client.post("/api/admin/jobs/run", json={"budget_seconds": budget}, headers=admin)
+        assert response.status_code == 400
+
+    assert client.post("/api/admin/jobs/run", json={"budget_seconds": "2"}, headers=admin).status_code == 200
+
+
+def test_bulk_extend_never_undoes_a_concurrent_revoke(client, primary, admin, monkeypatch):
+    keys = [g["key"] for g in generate(client, admin, 3)]
+    before = expiries(primary, keys)
+    target = sorted(keys)[1]
+    handler = index.JOB_TYPES["bulk_extend"]
+    revoked = []
+
+    def revoke_mid_chunk(redis, job, key, lic, raw, tx):
+        if key == target and not revoked:
+            # Lands after the chunk's MGET and before its MULTI
+            revoked.append(client.post("/api/admin/revoke", json={"key": key}, headers=admin).get_json())
+        return handler(redis, job, key, lic, raw, tx)
+
+    monkeypatch.setitem(index.JOB_TYPES, "bulk_extend", revoke_mid_chunk)
+    job = index.create_job(primary, "bulk_extend", {"days": 10, "include_inactive": True})
+    index.run_job_slice(primary, job["id"], index.time.time() + 5)
+
+    assert revoked[0]["success"]
+    assert index.get_license(primary, target)["revoked"] is True
+    after = expiries(primary, keys)
+    assert all(round(after[k] - before[k]) == 10 * 86400 for k in keys)
+    done = index.get_job(primary, job["id"])
+    assert done["result"] == {"extended": 3} and done["processed"] == 3
+
+
+def test_migrate_codec_never_overwrites_a_concurrent_write(client, primary, admin, monkeypatch):
+    import json
+    key = "IGTOOL-1111-2222-3333-4444"
+    v1 = {"tier": "pro", "created_at": 1, "expires_at": 2 ** 31, "revoked": False, "machines": [],
+          "max_machines_override": None, "last_validated": None, "notes": ""}
+    primary.set(f"license:{key}", json.dumps(v1))
+    primary.sadd("all_license_keys", key)
+    handler = index.JOB_TYPES["migrate_codec"]
+
+    def activate_mid_chunk(redis, job, k, lic, raw, tx):
+        if raw.startswith("{"):
+            changed = dict(v1, machines=[{"hwid": "HW1", "machine_name": "pc", "activated_at": 5}])
+            primary.set(f"license:{key}", json.dumps(changed))
+        return handler(redis, job, k, lic, raw, tx)
+
+    monkeypatch.setitem(index.JOB_TYPES, "migrate_codec", activate_mid_chunk)
+    job = index.create_job(primary, "migrate_codec", {})
+    index.run_job_slice(primary, job["id"], index.time.time() + 5)
+
+    stored = primary.get(f"license:{key}")
+    assert stored.startswith(index._V2_PREFIX)
+    assert index.decode_license(stored, key)["machines"][0]["hwid"] == "HW1"
+
+
+def test_slice_that_outlives_its_lease_stops_and_keeps_the_new_runners_lease(client, primary, admin, monkeypatch):
+    keys = [g["key"] for g in generate(client, admin, 4)]
+    before = expiries(primary, keys)
+    monkeypatch.setattr(index, "JOB_CHUNK_SIZE", 2)
+    handler = index.JOB_TYPES["bulk_extend"]
+    job = index.create_job(primary, "bulk_extend", {"days": 10})
+    lease = f"job_lease:{job['id']}"
+    calls = []
+
+    def lease_expires_mid_chunk(redis, job, key, lic, raw, tx):
+        calls.append(key)
+        if len(calls) == 3:
+            # Our lease ran out and another runner took the job over
+            primary.set(lease, "other-runner")
+        return handler(redis, job, key, lic, raw, tx)
+
+    monkeypatch.setitem(index.JOB_TYPES, "bulk_extend", lease_expires_mid_chunk)
+    assert index.run_job_slice(primary, job["id"], index.time.time() + 5)
+
+    assert primary.get(lease) == "other-runner"
+    interrupted = index.get_job(primary, job["id"])
+    assert interrupted["status"] == "running" and interrupted["processed"] == 2
+    assert not index.run_job_slice(primary, job["id"], index.time.time() + 5)
+
+    # The new runner finishes the job; nothing is extended twice
+    primary.delete(lease)
+    index.run_job_slice(primary, job["id"], index.time.time() + 5)
+    after = expiries(primary, keys)
+    assert index.get_job(primary, job["id"])["status"] == "done"
+    assert all(round(after[k] - before[k]) == 10 * 86400 for k in keys)
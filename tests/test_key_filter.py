@@ -0,0 +1,66 @@
+import index
+
+
+def issue_elsewhere(store, n):
+    """Issue a key the way another instance's admin_generate would"""
+    key = f"IGTOOL-{n:04X}-0000-0000-0000"
+    store.execute(["SADD", "all_license_keys", key])
+    store.execute(["LPUSH", "recent_license_keys", key])
+    store.execute(["LTRIM", "recent_license_keys", 0, index.RECENT_KEYS_MAX - 1])
+    version = store.execute(["INCR", "license_keys_version"])
+    return key, version
+
+
+def test_sync_picks_up_keys_from_other_instances(primary):
+    store = primary._session.store
+    index.rebuild_key_filter(primary)
+    issued = [issue_elsewhere(store, n)[0] for n in range(5)]
+
+    index.sync_key_filter(primary)
+
+    assert index._key_filter["version"] == 5
+    assert all(key in index._key_filter["bloom"] for key in issued)
+
+
+def test_sync_has_no_false_negatives_when_keys_are_issued_mid_sync(primary):
+    store = primary._session.store
+    index.rebuild_key_filter(primary)
+    issued = {}
+    for n in range(3):
+        key, version = issue_elsewhere(store, n)
+        issued[version] = key
+
+    # Another instance issues a key after every round trip this instance makes
+    session = primary._session
+    post = session.post
+
+    def interleaved_post(*args, **kwargs):
+        response = post(*args, **kwargs)
+        key, version = issue_elsewhere(store, len(issued))
+        issued[version] = key
+        return response
+
+    session.post = interleaved_post
+    index.sync_key_filter(primary)
+    session.post = post
+
+    synced = index._key_filter["version"]
+    assert synced >= 3
+    missing = [key for version, key in issued.items()
+               if version <= synced and key not in index._key_filter["bloom"]]
+    assert missing == []
+
+    # Whatever was issued after the sync is picked up by the next one
+    index.sync_key_filter(primary)
+    assert all(key in index._key_filter["bloom"] for key in issued.values())
+
+
+def test_sync_rebuilds_when_too_far_behind(primary):
+    store = primary._session.store
+    index.rebuild_key_filter(primary)
+    issued = [issue_elsewhere(store, n)[0] for n in range(index.KEY_FILTER_SYNC_BATCH + 1)]
+
+    index.sync_key_filter(primary)
+
+    assert index._key_filter["version"] == len(issued)
+    assert all(key in index._key_filter["bloom"] for key in issued)
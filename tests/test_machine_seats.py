@@ -0,0 +1,64 @@
+import time
+
+import index
+
+
+def old_license(activated_days_ago, validated_days_ago):
+    now = time.time()
+    return {
+        "tier": "pro",
+        "created_at": now - activated_days_ago * 86400,
+        "expires_at": now + 86400,
+        "machines": [{"hwid": "HW1", "machine_name": "pc", "activated_at": now - activated_days_ago * 86400}],
+        "last_validated": now - validated_days_ago * 86400,
+    }
+
+
+def test_never_seen_machine_on_recently_validated_license_is_active(primary):
+    lic = old_license(activated_days_ago=400, validated_days_ago=1)
+
+    assert index.stalest_inactive_machine(primary, "K", lic) is None
+
+
+def test_last_validated_hash_counts_for_never_seen_machines(primary):
+    lic = old_license(activated_days_ago=400, validated_days_ago=400)
+    assert index.stalest_inactive_machine(primary, "K", lic)["hwid"] == "HW1"
+
+    primary.hset("license_last_validated", "K", int(time.time()))
+    assert index.stalest_inactive_machine(primary, "K", lic) is None
+
+
+def test_backfill_seeds_from_last_validation(primary):
+    lic = old_license(activated_days_ago=400, validated_days_ago=2)
+
+    index.backfill_machines_seen(primary, "K", lic)
+
+    seeded = float(primary.zscore("machine_last_seen", "K|HW1"))
+    assert seeded == int(lic["last_validated"])
+    pruned, _ = index.sweep_inactive_machines(primary, 10)
+    assert pruned == []
+
+
+def test_sweep_prunes_machines_past_the_inactivity_window(client, primary, admin):
+    key = client.post("/api/admin/generate", json={"tier": "agency", "days": 30}, headers=admin).get_json()["key"]
+    for hwid in ("HW-OLD", "HW-NEW"):
+        client.post("/api/activate", json={"key": key, "hwid": hwid, "machine_name": "pc"})
+    long_ago = int(time.time() - (index.SEAT_INACTIVITY_DAYS + 1) * 86400)
+    primary.hset(f"machines_seen:{key}", "HW-OLD", long_ago)
+    primary.zadd("machine_last_seen", {f"{key}|HW-OLD": long_ago})
+
+    body = client.post("/api/admin/sweep-machines", json={"batch_size": 10}, headers=admin).get_json()
+
+    assert body["pruned"] == [{"key": key, "hwid": "HW-OLD"}] and body["more"] is False
+    assert [m["hwid"] for m in index.get_license(primary, key)["machines"]] == ["HW-NEW"]
+    assert primary.smembers("idx:hwid:HW-OLD") == []
+    assert primary.smembers("idx:hwid:HW-NEW") == [key]
+    assert primary.hget(f"machines_seen:{key}", "HW-OLD") is None
+    assert primary.zscore("machine_last_seen", f"{key}|HW-OLD") is None
+    assert primary.zscore("machine_last_seen", f"{key}|HW-NEW") is not None
+
+
+def test_sweep_rejects_a_bad_batch_size(client, admin):
+    for batch_size in ("lots", None, [5]):
+        response = client.post("/api/admin/sweep-machines", json={"batch_size": batch_size}, headers=admin)
+        assert response.status_code == 400
@@ -0,0 +1,136 @@
+import time
+
+import pytest
+
+import index
+from fake_upstash import FakeStore
+
+KEY = "IGTOOL-AAAA-BBBB-CCCC-DDDD"
+
+
+@pytest.fixture
+def replica(primary, endpoint_factory):
+    endpoint = endpoint_factory("replica-1", FakeStore())
+    index._endpoints["replicas"] = [endpoint]
+    return endpoint
+
+
+def replicate(primary, replica):
+    replica._session.store.copy_from(primary._session.store)
+
+
+def wait_for_probes(*endpoints):
+    deadline = time.time() + 2
+    while any(e.probing for e in endpoints) and time.time() < deadline:
+        time.sleep(0.005)
+
+
+def issue(primary, client, admin):
+    return client.post("/api/admin/generate", json={"tier": "pro", "days": 30}, headers=admin).get_json()
+
+
+def test_reads_go_to_the_faster_endpoint(primary, replica):
+    primary._session.delay = 0.02
+    for endpoint in (primary, replica):
+        for _ in range(3):
+            endpoint.ping()
+
+    assert index.get_read_redis() is replica
+
+    primary._session.delay, replica._session.delay = 0, 0.02
+    for endpoint in (primary, replica):
+        for _ in range(10):
+            endpoint.ping()
+    assert index.get_read_redis() is primary
+
+
+def test_stale_replica_is_taken_out_of_rotation(primary, replica):
+    index.bump_revision(primary)
+    replicate(primary, replica)
+    index.read_candidates()
+    wait_for_probes(primary, replica)
+    assert replica in index.read_candidates()
+
+    index.bump_revision(primary)
+    index._primary_revisions[-1] = (index._primary_revisions[-1][0],
+                                    time.time() - index.READ_REPLICA_MAX_STALENESS - 1)
+    assert replica not in index.read_candidates()
+
+    replicate(primary, replica)
+    index.probe_endpoint(replica)
+    assert replica in index.read_candidates()
+
+
+def test_min_revision_falls_back_to_primary_until_replica_catches_up(primary, replica):
+    replica.latency_ewma, primary.latency_ewma = 0.001, 0.05
+    revision = index.bump_revision(primary)
+
+    assert index.get_read_redis(revision) is primary
+
+    replicate(primary, replica)
+    assert index.get_read_redis(revision) is replica
+
+
+def test_validate_confirms_replica_miss_on_primary(client, primary, replica, admin):
+    issued = issue(primary, client, admin)
+    client.post("/api/activate", json={"key": issued["key"], "hwid": "HW1", "machine_name": "pc"})
+    replica.latency_ewma, primary.latency_ewma = 0.001, 0.05
+
+    body = client.post("/api/validate", json={"key": issued["key"], "hwid": "HW1"}).get_json()
+
+    # The replica has never seen the key; the primary answers instead
+    assert body["valid"] is True
+    assert ["GET", f"license:{issued['key']}"] in replica._session.calls
+    assert ["GET", f"license:{issued['key']}"] in primary._session.calls
+
+
+def test_validate_does_not_wait_for_revision_probes(client, primary, replica, admin):
+    issued = issue(primary, client, admin)
+    replicate(primary, replica)
+    replica.latency_ewma, primary.latency_ewma = 0.05, 0.001
+    primary.probed_at = replica.probed_at = 0
+    replica._session.delay = 0.3
+
+    started = time.perf_counter()
+    client.post("/api/validate", json={"key": issued["key"], "hwid": "HW1"})
+    assert time.perf_counter() - started < 0.2
+
+    wait_for_probes(primary, replica)
+    assert replica.revision == issued["revision"]
+
+
+def test_single_endpoint_read_is_not_hedged(primary, monkeypatch):
+    monkeypatch.setattr(index, "REDIS_HEDGE_AFTER_SECONDS", 0.01)
+    primary._session.delay = 0.05
+
+    value, endpoint = index.hedged_read(lambda r: r.get("missing"), index.read_candidates())
+
+    assert value is None and endpoint is primary
+    assert primary._session.calls == [["GET", "missing"]]
+
+
+def test_slow_read_is_hedged_to_the_next_endpoint(primary, replica, monkeypatch):
+    monkeypatch.setattr(index, "REDIS_HEDGE_AFTER_SECONDS", 0.01)
+    primary.set("k", "v")
+    replicate(primary, replica)
+    replica._session.delay = 0.2
+
+    value, endpoint = index.hedged_read(lambda r: r.get("k"), [replica, primary])
+
+    assert value == "v" and endpoint is primary
+
+
+def test_cold_instance_validates_from_replica_while_primary_is_down(client, primary, replica, admin):
+    issued = issue(primary, client, admin)
+    client.post("/api/activate", json={"key": issued["key"], "hwid": "HW1", "machine_name": "pc"})
+    replicate(primary, replica)
+    # A fresh instance: no key filter and no snapshots yet
+    index._key_filter.update(bloom=None, version=None, synced_at=0)
+    index._license_snapshots.clear()
+    primary._session.down = True
+
+    body = client.post("/api/validate", json={"key": issued["key"], "hwid": "HW1"}).get_json()
+
+    assert body["valid"] is True and "degraded" not in body
+    assert ["GET", f"license:{issued['key']}"] in replica._session.calls
+    assert index._key_filter["failed_open"] == 1
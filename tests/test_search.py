@@ -0,0 +1,109 @@
+import copy
+
+import index
+
+K1 = "IGTOOL-AAAA-1111-2222-3333"
+K2 = "IGTOOL-BBBB-4444-5555-6666"
+
+
+def lic(notes="", machines=(), tier="pro"):
+    return {"tier": tier, "created_at": 0, "expires_at": 2 ** 31, "notes": notes,
+            "machines": [{"hwid": h, "machine_name": n, "activated_at": 0} for h, n in machines]}
+
+
+def word_terms(primary):
+    """idx:terms without key segments"""
+    segments = index.key_segment_terms(K1) | index.key_segment_terms(K2)
+    return sorted(t for t in primary.zrange("idx:terms", 0, -1) if t not in segments)
+
+
+def test_term_is_dropped_when_its_last_license_no_longer_has_it(primary):
+    a, b = lic("acme reseller"), lic("acme direct")
+    index.update_license_index(primary, K1, a)
+    index.update_license_index(primary, K2, b)
+
+    edited = dict(a, notes="globex reseller")
+    index.update_license_index(primary, K1, edited, a)
+    assert "acme" in word_terms(primary)
+
+    index.remove_license_index(primary, K2, b)
+    assert word_terms(primary) == ["globex", "reseller"]
+    assert primary.smembers("idx:tok:acme") == []
+    assert "bbbb" not in primary.zrange("idx:terms", 0, -1)
+
+
+def test_machine_name_terms_follow_deactivation(primary):
+    before = lic(machines=[("HW1", "office laptop")])
+    index.update_license_index(primary, K1, before)
+
+    after = copy.deepcopy(before)
+    after["machines"] = []
+    index.update_license_index(primary, K1, after, before)
+
+    assert word_terms(primary) == []
+    assert index.search_license_keys(primary, "lap", 10) == []
+
+
+def test_search_still_finds_remaining_licenses(primary):
+    index.update_license_index(primary, K1, lic("acme"))
+    index.update_license_index(primary, K2, lic("acme"))
+    index.remove_license_index(primary, K1, lic("acme"))
+
+    assert index.search_license_keys(primary, "acm", 10) == [K2]
+
+
+def test_search_matches_middle_key_segments(primary):
+    index.update_license_index(primary, K1, lic())
+    index.update_license_index(primary, K2, lic())
+
+    assert index.search_license_keys(primary, "5555", 10) == [K2]
+    assert index.search_license_keys(primary, "2222-3333", 10) == [K1]
+
+
+def test_common_word_reads_are_bounded_by_the_limit(primary):
+    keys = [f"IGTOOL-{n:04X}-0000-0000-0000" for n in range(300)]
+    for key in keys:
+        index.update_license_index(primary, key, lic("Auto-generated trial"))
+    primary._session.calls.clear()
+
+    matches = index.search_license_keys(primary, "tr", 5)
+
+    assert len(matches) == 5 and set(matches) <= set(keys)
+    for body in primary._session.calls:
+        for command in body if isinstance(body[0], list) else [body]:
+            assert command[0] not in ("SUNION", "SMEMBERS") or not command[1].startswith("idx:tok:")
+
+
+def test_multi_word_query_needs_every_word(primary):
+    index.update_license_index(primary, K1, lic("acme reseller"))
+    index.update_license_index(primary, K2, lic("acme direct"))
+
+    assert index.search_license_keys(primary, "acme dir", 10) == [K2]
+
+
+def test_search_endpoint_returns_license_summaries(client, primary, admin):
+    issued = client.post("/api/admin/generate", json={"tier": "pro", "days": 30, "notes": "Acme Corp"},
+                         headers=admin).get_json()
+    client.post("/api/activate", json={"key": issued["key"], "hwid": "HW-123", "machine_name": "Front desk"})
+
+    for query in ("acme", "fron", "HW-123", issued["key"][:11], issued["key"].split("-")[3]):
+        body = client.get(f"/api/admin/search?q={query}", headers=admin).get_json()
+        assert [k["key"] for k in body["keys"]] == [issued["key"]], query
+
+    assert client.get("/api/admin/search?q=acme&limit=x", headers=admin).status_code == 400
+    assert client.get("/api/admin/search?q=acme").status_code == 401
+
+
+def test_deactivate_by_hwid_removes_machine_from_every_license(client, primary, admin):
+    keys = []
+    for _ in range(2):
+        key = client.post("/api/admin/generate", json={"tier": "agency", "days": 30}, headers=admin).get_json()["key"]
+        client.post("/api/activate", json={"key": key, "hwid": "HW-SHARED", "machine_name": "pc"})
+        keys.append(key)
+
+    body = client.post("/api/admin/deactivate", json={"hwid": "HW-SHARED"}, headers=admin).get_json()
+
+    assert body["success"] and body["keys"] == sorted(keys)
+    assert all(index.get_license(primary, k)["machines"] == [] for k in keys)
+    assert primary.smembers("idx:hwid:HW-SHARED") == []
+    assert client.get("/api/admin/search?q=HW-SHARED", headers=admin).get_json()["keys"] == []
@@ -0,0 +1,80 @@
+import json
+import time
+
+import index
+
+KEY = "IGTOOL-1111-2222-3333-4444"
+
+
+def issue_v1(primary, machines=()):
+    lic = {
+        "key": KEY, "tier": "pro", "created_at": time.time(), "expires_at": time.time() + 86400,
+        "revoked": False, "machines": [{"hwid": h, "machine_name": "pc", "activated_at": time.time()} for h in machines],
+        "max_machines_override": None, "last_validated": None, "notes": "",
+    }
+    primary.set(f"license:{KEY}", json.dumps(lic))
+    primary.sadd("all_license_keys", KEY)
+    index.register_issued_key(primary, KEY)
+    return lic
+
+
+def test_validate_migrates_v1_record_on_heartbeat(client, primary):
+    issue_v1(primary, machines=["HW1"])
+
+    body = client.post("/api/validate", json={"key": KEY, "hwid": "HW1"}).get_json()
+
+    assert body["valid"]
+    stored = primary.get(f"license:{KEY}")
+    assert stored.startswith(index._V2_PREFIX)
+    assert index.decode_license(stored, KEY)["machines"][0]["hwid"] == "HW1"
+    assert primary.get("license_revision") is None
+
+
+def test_v1_rewrite_never_overwrites_a_newer_record(primary):
+    issue_v1(primary, machines=["HW1"])
+    stale_raw = primary.get(f"license:{KEY}")
+    newer = dict(index.decode_license(stale_raw, KEY), revoked=True)
+    index.save_license(primary, KEY, newer)
+
+    index.record_heartbeat(primary, KEY, "HW1", stale_raw)
+
+    assert index.get_license(primary, KEY)["revoked"] is True
+
+
+def activated_key(client, primary, admin):
+    key = client.post("/api/admin/generate", json={"tier": "pro", "days": 30}, headers=admin).get_json()["key"]
+    client.post("/api/activate", json={"key": key, "hwid": "HW1", "machine_name": "pc"})
+    assert client.post("/api/validate", json={"key": key, "hwid": "HW1"}).get_json()["valid"]
+    return key
+
+
+def test_outage_serves_last_snapshot_as_degraded(client, primary, admin):
+    key = activated_key(client, primary, admin)
+    primary._session.down = True
+
+    body = client.post("/api/validate", json={"key": key, "hwid": "HW1"}).get_json()
+
+    assert body["valid"] is True and body["degraded"] is True
+
+
+def test_revoke_then_outage_stays_revoked(client, primary, admin):
+    key = activated_key(client, primary, admin)
+    client.post("/api/admin/revoke", json={"key": key}, headers=admin)
+    primary._session.down = True
+
+    body = client.post("/api/validate", json={"key": key, "hwid": "HW1"}).get_json()
+
+    assert body["valid"] is False and body["degraded"] is True
+
+
+def test_revoke_seen_by_validate_survives_an_outage(client, primary, admin):
+    key = activated_key(client, primary, admin)
+    # Revoked by another instance: this one only learns of it through validate
+    lic = index.get_license(primary, key)
+    index.save_license(primary, key, dict(lic, revoked=True))
+    assert client.post("/api/validate", json={"key": key, "hwid": "HW1"}).get_json()["valid"] is False
+    primary._session.down = True
+
+    body = client.post("/api/validate", json={"key": key, "hwid": "HW1"}).get_json()
+
+    assert body["valid"] is False and body["error"] == "License has been revoked"